@@ -0,0 +1,352 @@
+"""
+Offline ingestion and query benchmark.
+
+Generates synthetic documentation archives, then measures each ingestion stage
+(root discovery, extension filtering, decoding, passage splitting and index
+fit) and query latency. Every stage runs in a freshly spawned process, so its
+peak RSS is its own (with its inputs loaded) and not the high-water mark of
+the stages before it. Results are written as JSON;
+pass a previous results file with --compare to print the relative change.
+
+Usage:
+    python bench.py --sizes 1000 10000 --backends bm25 minsearch
+    python bench.py --sizes 100000 --compare data/bench/baseline.json
+    python bench.py --sizes 100000 --compact --pruning
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import search
+from passages import split_documents
+from postings import CompactIndex
+
+WORDS_PER_VOCABULARY = 20_000
+QUERY_COUNT = 500
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_vocabulary(rng: random.Random) -> list[str]:
+    """Create a synthetic vocabulary of pronounceable words."""
+    consonants, vowels = "bcdfghjklmnprstvwz", "aeiou"
+    words = set()
+    while len(words) < WORDS_PER_VOCABULARY:
+        length = rng.randint(2, 5)
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    return sorted(words)
+
+
+def make_document(rng: random.Random, vocabulary: list[str], cum_weights: list[float]) -> str:
+    """Create one Markdown document with headings, prose and a code fence."""
+    target = int(min(rng.lognormvariate(7.5, 1.0), 64_000))
+    lines = [f"# {' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=3)).title()}", ""]
+    size = 0
+
+    while size < target:
+        heading = f"## {' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=2)).title()}"
+        paragraph = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(20, 120)))
+        lines += [heading, "", paragraph, ""]
+        if rng.random() < 0.3:
+            lines += ["```python", f"{rng.choice(vocabulary)} = {rng.randint(0, 99)}", "```", ""]
+        size += len(heading) + len(paragraph)
+
+    return "\n".join(lines)
+
+
+def make_archive(path: Path, n_files: int, seed: int) -> Path:
+    """
+    Write a synthetic repository archive, reusing it if it already exists.
+
+    About one entry in five is a non-documentation file, so extension filtering
+    has work to do.
+
+    Args:
+        path (Path): Directory for the archive.
+        n_files (int): Number of Markdown documents.
+        seed (int): Random seed.
+
+    Returns:
+        Path: The archive path.
+    """
+    zip_path = path / f"synthetic-{n_files}-{seed}.zip"
+    if zip_path.exists():
+        return zip_path
+
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    # Zipf-like term frequencies, as in natural text
+    cum_weights = list(
+        itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary)))
+    )
+
+    path.mkdir(parents=True, exist_ok=True)
+    tmp_path = zip_path.with_suffix(".tmp")
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for i in range(n_files):
+            folder = f"docs/section{i % 50}/topic{i % 7}"
+            suffix = ".mdx" if i % 4 == 0 else ".md"
+            archive.writestr(
+                f"synthetic-main/{folder}/page{i}{suffix}",
+                make_document(rng, vocabulary, cum_weights),
+            )
+            if i % 4 == 0:
+                archive.writestr(f"synthetic-main/src/module{i}.py", "pass\n")
+    tmp_path.replace(zip_path)
+    return zip_path
+
+
+def make_queries(seed: int) -> list[str]:
+    """Create a query corpus of one to four terms drawn from the vocabulary."""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    # Favor mid-frequency terms, with some rare and some very common ones
+    return [
+        " ".join(rng.choice(vocabulary[: rng.choice([50, 2000, len(vocabulary)])])
+                 for _ in range(rng.randint(1, 4)))
+        for _ in range(QUERY_COUNT)
+    ]
+
+
+def measure(func, args: tuple, kwargs: dict) -> tuple:
+    """Run a function and return its result, wall time and the peak RSS."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start, peak_rss_mb()
+
+
+def isolated(func, *args, **kwargs) -> tuple:
+    """Run `measure` in a freshly spawned process, so its peak RSS is its own."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(measure, func, args, kwargs).result()
+
+
+def timed(stages: dict, name: str, func, *args, **kwargs):
+    """Run one stage in its own process and record its wall time and peak RSS."""
+    result, seconds, peak = isolated(func, *args, **kwargs)
+    stages[name] = {"seconds": round(seconds, 4), "peak_rss_mb": round(peak, 1)}
+    return result
+
+
+def decode_documents(directory: str, filename: str) -> list[dict]:
+    """Decode every documentation file of an archive."""
+    return list(search.iter_docs_from_zip_file(directory, filename))
+
+
+def query_latencies(index, queries: list[str], prune: bool = False) -> dict:
+    """Time each query against an index and summarize the latencies."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        if prune:
+            index.search(query, num_results=5, prune=True)
+        else:
+            search.search_index(index, query, top_k=5)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "query_p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "queries": len(queries),
+        "index_mb": round(search.index_stats(index)["bytes"] / 1e6, 1),
+    }
+
+
+def run_one(
+    zip_path: Path,
+    backends: list[str],
+    passages: bool,
+    seed: int,
+    compact: bool = False,
+    pruning: bool = False,
+) -> dict:
+    """
+    Benchmark all stages on one archive.
+
+    Args:
+        zip_path (Path): Synthetic archive.
+        backends (list[str]): Search backends to fit and query.
+        passages (bool): Index heading passages instead of whole documents.
+        seed (int): Seed of the query corpus.
+        compact (bool): Also encode the bm25 index as compact postings
+            (reported as backend "bm25_compact").
+        pruning (bool): Also time bm25 queries with MaxScore pruning (reported
+            with a "_pruned" suffix).
+
+    Returns:
+        dict: Stage timings and query latencies.
+    """
+    directory, filename = str(zip_path.parent), zip_path.name
+    stages: dict[str, dict] = {}
+    # What a spawned interpreter with the benchmark's imports starts at
+    result: dict = {"baseline_rss_mb": round(isolated(peak_rss_mb)[0], 1)}
+
+    timed(stages, "root_discovery", search.discover_zip_root, directory, filename)
+    manifest = timed(stages, "extension_filtering", search.read_zip_manifest, directory, filename)
+    documents = timed(stages, "decoding", decode_documents, directory, filename)
+    if passages:
+        documents = timed(stages, "passage_splitting", split_documents, documents)
+
+    result["documents"] = len(manifest)
+    result["indexed_documents"] = len(documents)
+    result["megabytes"] = round(sum(size for _, size in manifest.values()) / 1e6, 1)
+
+    queries = make_queries(seed)
+    result["backends"] = {}
+    for backend in backends:
+        index = timed(
+            stages, f"fit_{backend}", search.create_search_index, documents, backend=backend
+        )
+
+        result["backends"][backend] = query_latencies(index, queries)
+        if pruning and backend == "bm25":
+            result["backends"]["bm25_pruned"] = query_latencies(index, queries, prune=True)
+
+        if compact and backend == "bm25":
+            compact_index = timed(stages, "compact_bm25", CompactIndex.from_bm25, index)
+            result["backends"]["bm25_compact"] = query_latencies(compact_index, queries)
+            if pruning:
+                result["backends"]["bm25_compact_pruned"] = query_latencies(
+                    compact_index, queries, prune=True
+                )
+            del compact_index
+        del index
+
+    result["stages"] = stages
+    return result
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print the change of every timing against a baseline results file."""
+    if (results["backends"], results["passages"]) != (baseline["backends"], baseline["passages"]):
+        print("Warning: baseline was run with different --backends/--passages")
+
+    for size, run in results["runs"].items():
+        base = baseline["runs"].get(size)
+        if base is None:
+            continue
+        print(f"\n{size} files vs baseline:")
+
+        pairs = [
+            (f"stage {name}", stage["seconds"], base["stages"][name]["seconds"])
+            for name, stage in run["stages"].items()
+            if name in base["stages"]
+        ]
+        pairs += [
+            (f"{backend} {metric}", values[metric], base["backends"][backend][metric])
+            for backend, values in run["backends"].items()
+            if backend in base["backends"]
+            for metric in ("query_p50_ms", "query_p99_ms")
+        ]
+        for label, new, old in pairs:
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"  {label:<32} {old:>10.3f} -> {new:>10.3f} ({change:+.1f}%)")
+
+
+def git_revision() -> str | None:
+    """Return the current commit, if running inside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and search offline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--backends", nargs="+", default=["bm25"], choices=search.SEARCH_BACKENDS)
+    parser.add_argument("--passages", action="store_true", help="index heading passages")
+    parser.add_argument("--compact", action="store_true", help="also time compact bm25 postings")
+    parser.add_argument("--pruning", action="store_true", help="also time pruned bm25 queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default="data/bench", help="where archives are cached")
+    parser.add_argument("--output", default="data/bench/results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        # Child process: benchmark one archive and report on stdout
+        result = run_one(
+            Path(args.run_one),
+            args.backends,
+            args.passages,
+            args.seed,
+            compact=args.compact,
+            pruning=args.pruning,
+        )
+        print(json.dumps(result))
+        return
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backends": args.backends,
+        "passages": args.passages,
+        "seed": args.seed,
+        "runs": {},
+    }
+
+    for size in args.sizes:
+        print(f"Generating {size} files...", file=sys.stderr)
+        zip_path = make_archive(Path(args.workdir), size, args.seed)
+
+        print(f"Benchmarking {size} files...", file=sys.stderr)
+        command = [
+            sys.executable, __file__, "--run-one", str(zip_path),
+            "--seed", str(args.seed), "--backends", *args.backends,
+        ]
+        if args.passages:
+            command.append("--passages")
+        if args.compact:
+            command.append("--compact")
+        if args.pruning:
+            command.append("--pruning")
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        run = json.loads(output)
+        results["runs"][str(size)] = run
+
+        for name, stage in run["stages"].items():
+            print(f"  {name:<22} {stage['seconds']:>9.3f}s  {stage['peak_rss_mb']:>8.1f} MiB")
+        for backend, values in run["backends"].items():
+            print(
+                f"  {backend} query p50 {values['query_p50_ms']:.3f} ms, "
+                f"p99 {values['query_p99_ms']:.3f} ms, index {values['index_mb']:.1f} MB"
+            )
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output_path}", file=sys.stderr)
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
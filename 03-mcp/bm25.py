@@ -0,0 +1,504 @@
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+# Relative slack on pruning decisions, far above float32 rounding of the bounds
+PRUNING_EPSILON = 1e-5
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase word tokens (same pattern as minsearch).
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list[str]: Tokens of at least two word characters.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def row_maxima(matrix: sparse.csr_matrix) -> np.ndarray:
+    """Return the largest value of each row of a CSR matrix (0 for empty rows)."""
+    maxima = np.zeros(matrix.shape[0], dtype=np.float32)
+    nonempty = np.flatnonzero(np.diff(matrix.indptr))
+    if len(nonempty):
+        maxima[nonempty] = np.maximum.reduceat(matrix.data, matrix.indptr[nonempty])
+    return maxima
+
+
+def maxscore_top_k(index, query_terms: dict[int, int], k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Select the top-k documents of a query with MaxScore dynamic pruning.
+
+    Every term has an upper bound: its largest weight times its query count.
+    Terms are scored whole (highest bound first) only until the bounds of the
+    terms left add up to less than the current k-th best partial score; no
+    document unseen by then can enter the top k. The remaining terms are only
+    looked up for the candidates seen so far, and candidates whose partial
+    score plus the bounds left fall below the k-th best are dropped after each
+    term. The survivors are finally rescored in the same order and precision as
+    exhaustive scoring, so results (ties included) match it exactly.
+
+    Args:
+        index: Index providing `term_bound(term_id)`, `postings(term_id)` and
+            `lookup(term_id, doc_ids)`, plus `docs`.
+        query_terms (dict[int, int]): Term id -> number of occurrences in the query.
+        k (int): Number of documents to keep.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Ids of the top documents (by descending
+            score, ties by id) and their float32 scores.
+    """
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+    if k <= 0 or not query_terms:
+        return empty
+
+    bounds = {t: float(index.term_bound(t)) * count for t, count in query_terms.items()}
+    by_bound = sorted(query_terms, key=lambda t: -bounds[t])
+    remaining = sum(bounds.values())
+    threshold = 0.0
+    partial = np.zeros(len(index.docs))
+    leaders = np.zeros(0, dtype=np.int64)  # current k best documents
+    decoded: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    # Essential terms: score whole posting lists
+    for t in by_bound:
+        if threshold > 0 and remaining < threshold * (1 - PRUNING_EPSILON):
+            break
+        doc_ids, weights = decoded[t] = index.postings(t)
+        partial[doc_ids] += weights * query_terms[t]
+        remaining -= bounds[t]
+
+        # Only the scores of this term's documents grew, so the new k best are
+        # among them and the previous k best
+        contenders = np.concatenate([leaders[~_positions(doc_ids, leaders)[1]], doc_ids])
+        if len(contenders) > k:
+            best = np.argpartition(partial[contenders], -k)[-k:]
+            leaders = contenders[best]
+            threshold = float(partial[leaders].min())
+        else:
+            leaders = contenders
+
+    candidates = np.flatnonzero(partial > 0)
+    scores = partial[candidates]
+
+    # Non-essential terms: only look up the candidates that can still make it
+    for t in by_bound[len(decoded) :] + [None]:
+        keep = scores + remaining >= threshold * (1 - PRUNING_EPSILON)
+        candidates, scores = candidates[keep], scores[keep]
+        if t is None:
+            break
+        # Later candidates are a subset, so these weights serve the rescoring too
+        decoded[t] = (candidates, index.lookup(t, candidates))
+        scores = scores + decoded[t][1] * query_terms[t]
+        remaining -= bounds[t]
+        if len(scores) > k:
+            threshold = max(threshold, float(np.partition(scores, -k)[-k]))
+
+    # Exact rescoring, term by term in ascending id order like a matrix product
+    exact = np.zeros(len(candidates), dtype=np.float32)
+    for t in sorted(query_terms):
+        exact += _gather(*decoded[t], candidates) * np.float32(query_terms[t])
+
+    matched = exact > 0
+    candidates, exact = candidates[matched], exact[matched]
+    top = BM25Index.top_k(candidates, exact, k)
+    return top, exact[np.searchsorted(candidates, top)]
+
+
+def _positions(doc_ids: np.ndarray, wanted: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Binary-search ids in a sorted posting list: (positions, found mask)."""
+    if len(doc_ids) == 0:
+        return np.zeros(len(wanted), dtype=np.int64), np.zeros(len(wanted), dtype=bool)
+    positions = np.minimum(np.searchsorted(doc_ids, wanted), len(doc_ids) - 1)
+    return positions, doc_ids[positions] == wanted
+
+
+def _gather(doc_ids: np.ndarray, weights: np.ndarray, wanted: np.ndarray) -> np.ndarray:
+    """Return the weights of `wanted` ids in a sorted posting list, 0 if absent."""
+    out = np.zeros(len(wanted), dtype=np.float32)
+    positions, found = _positions(doc_ids, wanted)
+    out[found] = weights[positions[found]]
+    return out
+
+
+def _resize_rows(matrix: sparse.csr_matrix, n_rows: int) -> sparse.csr_matrix:
+    """Append empty rows to a CSR matrix without copying its data."""
+    missing = n_rows - matrix.shape[0]
+    if missing <= 0:
+        return matrix
+    indptr = np.concatenate(
+        [matrix.indptr, np.full(missing, matrix.indptr[-1], dtype=matrix.indptr.dtype)]
+    )
+    return sparse.csr_matrix(
+        (matrix.data, matrix.indices, indptr), shape=(n_rows, matrix.shape[1])
+    )
+
+
+class BM25Index:
+    """
+    BM25 search index backed by a sparse term-document matrix.
+
+    Each text field is scored with BM25 against its own length statistics and the
+    per-field scores are combined with `field_weights`. Because BM25 term weights
+    do not depend on the query, the weighted sum is precomputed at fit time into a
+    single CSR matrix with one row per term. A batch of queries is then one sparse
+    matrix product followed by an argpartition top-k per query.
+
+    Attributes:
+        text_fields (list[str]): Text fields to index.
+        field_weights (dict[str, float]): Weight of each field in the final score.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalization.
+        vocabulary (dict[str, int]): Term to row id.
+        term_doc_matrix (sparse.csr_matrix): Weighted BM25 scores, terms x documents.
+        term_max_weights (np.ndarray): Largest weight of each term, the upper
+            bounds used by MaxScore pruning.
+        term_counts (dict[str, sparse.csr_matrix]): Raw term counts of each field,
+            kept so documents can be added or removed without re-tokenizing.
+        doc_lengths (dict[str, np.ndarray]): Token count of each field per document.
+        docs (list[dict]): Indexed documents, in matrix column order.
+    """
+
+    def __init__(
+        self,
+        text_fields: list[str],
+        field_weights: dict[str, float] | None = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.text_fields = text_fields
+        self.field_weights = {field: 1.0 for field in text_fields}
+        self.field_weights.update(field_weights or {})
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: dict[str, int] = {}
+        self.term_doc_matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.term_max_weights = np.zeros(0, dtype=np.float32)
+        self.term_counts: dict[str, sparse.csr_matrix] = {}
+        self.doc_lengths: dict[str, np.ndarray] = {}
+        self.docs: list[dict] = []
+
+    def _count_terms(
+        self, field: str, docs: list[dict]
+    ) -> tuple[sparse.csr_matrix, np.ndarray]:
+        """Count terms of one field as a (terms x docs) matrix plus doc lengths."""
+        vocabulary = self.vocabulary
+        rows: list[int] = []
+        cols: list[int] = []
+        tfs: list[int] = []
+        lengths = np.zeros(len(docs), dtype=np.float32)
+
+        for doc_id, doc in enumerate(docs):
+            tokens = tokenize(doc.get(field) or "")
+            lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                rows.append(vocabulary.setdefault(term, len(vocabulary)))
+                cols.append(doc_id)
+                tfs.append(tf)
+
+        counts = sparse.csr_matrix(
+            (
+                np.asarray(tfs, dtype=np.float32),
+                (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)),
+            ),
+            shape=(len(vocabulary), len(docs)),
+            dtype=np.float32,
+        )
+        return counts, lengths
+
+    def _field_weights(self, field: str) -> sparse.csr_matrix:
+        """Turn the term counts of one field into BM25 weights."""
+        counts = self.term_counts[field]
+        lengths = self.doc_lengths[field]
+
+        n_docs = counts.shape[1]
+        avg_length = float(lengths.mean()) if n_docs and lengths.any() else 1.0
+        df = np.diff(counts.indptr).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+        rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        tf = counts.data
+        norm = self.k1 * (1.0 - self.b + self.b * lengths[counts.indices] / avg_length)
+        weights = idf[rows] * tf * (self.k1 + 1.0) / (tf + norm)
+
+        return sparse.csr_matrix(
+            (weights.astype(np.float32), counts.indices, counts.indptr),
+            shape=counts.shape,
+        )
+
+    def _reweight(self) -> None:
+        """Rebuild `term_doc_matrix` from the per-field term counts."""
+        matrix = sparse.csr_matrix(
+            (len(self.vocabulary), len(self.docs)), dtype=np.float32
+        )
+        for field in self.text_fields:
+            # Duplicate (term, doc) pairs from different fields are summed
+            matrix = matrix + self._field_weights(field) * self.field_weights[field]
+        self.term_doc_matrix = matrix.astype(np.float32).tocsr()
+        self.term_doc_matrix.sort_indices()  # posting lists are searched by doc id
+        self.term_max_weights = row_maxima(self.term_doc_matrix)
+
+    def fit(self, docs: list[dict]) -> "BM25Index":
+        """
+        Fit the index with the provided documents.
+
+        Args:
+            docs (list[dict]): Documents to index.
+
+        Returns:
+            BM25Index: The fitted index.
+        """
+        self.docs = docs
+        self.vocabulary = {}
+        self.term_counts = {}
+        self.doc_lengths = {}
+
+        for field in self.text_fields:
+            self.term_counts[field], self.doc_lengths[field] = self._count_terms(
+                field, docs
+            )
+
+        # Fields tokenized first were built against a smaller vocabulary
+        for field, counts in self.term_counts.items():
+            self.term_counts[field] = _resize_rows(counts, len(self.vocabulary))
+
+        self._reweight()
+        return self
+
+    def updated(
+        self,
+        added: list[dict],
+        removed: set[tuple[str | None, str]],
+    ) -> "BM25Index":
+        """
+        Return a copy of the index with documents added and removed.
+
+        Only the added documents are tokenized; the term counts of every other
+        document are reused, and the BM25 weights (which depend on corpus-wide
+        document frequencies and lengths) are recomputed with vectorized array
+        operations. The current index is left untouched so it can keep serving
+        searches until the copy is published.
+
+        Args:
+            added (list[dict]): New documents, appended after the kept ones.
+            removed (set[tuple[str | None, str]]): (repo, filename) keys of the
+                documents to drop, including every passage of those files.
+
+        Returns:
+            BM25Index: The updated index.
+        """
+        index = BM25Index(self.text_fields, self.field_weights, k1=self.k1, b=self.b)
+        index.vocabulary = dict(self.vocabulary)
+
+        keep = np.asarray(
+            [
+                i
+                for i, doc in enumerate(self.docs)
+                if (doc.get("repo"), doc["filename"]) not in removed
+            ],
+            dtype=np.int64,
+        )
+        index.docs = [self.docs[i] for i in keep] + list(added)
+        index.term_counts = {}
+        index.doc_lengths = {}
+
+        for field in self.text_fields:
+            new_counts, new_lengths = index._count_terms(field, added)
+            index.term_counts[field] = (
+                self.term_counts[field][:, keep],
+                new_counts,
+            )
+            index.doc_lengths[field] = np.concatenate(
+                [self.doc_lengths[field][keep], new_lengths]
+            )
+
+        n_terms = len(index.vocabulary)
+        for field, (kept, new) in index.term_counts.items():
+            index.term_counts[field] = sparse.hstack(
+                [_resize_rows(kept, n_terms), _resize_rows(new, n_terms)],
+                format="csr",
+                dtype=np.float32,
+            )
+
+        index._reweight()
+        return index
+
+    def query_matrix(self, queries: list[str]) -> sparse.csr_matrix:
+        """
+        Encode queries as sparse term-count row vectors.
+
+        Args:
+            queries (list[str]): Search queries.
+
+        Returns:
+            sparse.csr_matrix: len(queries) x vocabulary matrix of query term counts.
+        """
+        rows: list[int] = []
+        term_ids: list[int] = []
+        values: list[int] = []
+
+        for row, query in enumerate(queries):
+            counts = self.query_terms(query)
+            rows.extend([row] * len(counts))
+            term_ids.extend(counts.keys())
+            values.extend(counts.values())
+
+        return sparse.csr_matrix(
+            (
+                np.asarray(values, dtype=np.float32),
+                (np.asarray(rows, dtype=np.int64), np.asarray(term_ids, dtype=np.int64)),
+            ),
+            shape=(len(queries), len(self.vocabulary)),
+            dtype=np.float32,
+        )
+
+    def term_bound(self, term_id: int) -> float:
+        """Return the largest weight of a term."""
+        return self.term_max_weights[term_id]
+
+    def postings(self, term_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the posting list of a term.
+
+        Args:
+            term_id (int): Row of the term.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Sorted document ids and their weights.
+        """
+        matrix = self.term_doc_matrix
+        start, end = matrix.indptr[term_id], matrix.indptr[term_id + 1]
+        return matrix.indices[start:end], matrix.data[start:end]
+
+    def lookup(self, term_id: int, doc_ids: np.ndarray) -> np.ndarray:
+        """
+        Return the weights of a term for some documents, by binary search.
+
+        Args:
+            term_id (int): Row of the term.
+            doc_ids (np.ndarray): Sorted document ids.
+
+        Returns:
+            np.ndarray: float32 weights aligned with `doc_ids` (0 if absent).
+        """
+        return _gather(*self.postings(term_id), doc_ids)
+
+    def query_terms(self, query: str) -> dict[int, int]:
+        """Return term id -> occurrences for the indexed terms of a query."""
+        return dict(
+            Counter(
+                self.vocabulary[token]
+                for token in tokenize(query)
+                if token in self.vocabulary
+            )
+        )
+
+    @staticmethod
+    def top_k(doc_ids: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        Select the k highest scoring documents without a full sort.
+
+        Ties are broken by document id so results are deterministic.
+
+        Args:
+            doc_ids (np.ndarray): Ids of the scored documents.
+            scores (np.ndarray): Scores aligned with `doc_ids`.
+            k (int): Number of documents to keep.
+
+        Returns:
+            np.ndarray: Document ids ordered by descending score.
+        """
+        if k <= 0 or len(scores) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        if len(scores) > k:
+            # Keep everything tied with the k-th score so the tie-break is stable
+            kth = scores[np.argpartition(scores, -k)[-k]]
+            candidates = np.flatnonzero(scores >= kth)
+            doc_ids, scores = doc_ids[candidates], scores[candidates]
+
+        order = np.lexsort((doc_ids, -scores))[:k]
+        return doc_ids[order]
+
+    def search(self, query: str, num_results: int = 10, prune: bool = False) -> list[dict]:
+        """
+        Search the index and return the best matching documents.
+
+        Args:
+            query (str): The search query.
+            num_results (int): Number of results to return.
+            prune (bool): Use MaxScore pruning (same results, see `maxscore_top_k`).
+
+        Returns:
+            list[dict]: Documents ranked by BM25 score.
+        """
+        return self.search_batch([query], num_results=num_results, prune=prune)[0]
+
+    def search_batch(
+        self, queries: list[str], num_results: int = 10, prune: bool = False
+    ) -> list[list[dict]]:
+        """
+        Score several queries with a single sparse matrix product.
+
+        Args:
+            queries (list[str]): Search queries.
+            num_results (int): Number of results to return per query.
+            prune (bool): Use MaxScore pruning instead, one query at a time.
+
+        Returns:
+            list[list[dict]]: Ranked documents for each query, in input order.
+        """
+        return [
+            [doc for _, doc in results]
+            for results in self.search_batch_scored(
+                queries, num_results=num_results, prune=prune
+            )
+        ]
+
+    def search_batch_scored(
+        self, queries: list[str], num_results: int = 10, prune: bool = False
+    ) -> list[list[tuple[float, dict]]]:
+        """
+        Like `search_batch`, but return (score, document) pairs.
+
+        Args:
+            queries (list[str]): Search queries.
+            num_results (int): Number of results to return per query.
+            prune (bool): Use MaxScore pruning instead, one query at a time.
+
+        Returns:
+            list[list[tuple[float, dict]]]: Ranked (BM25 score, document) pairs
+                for each query, in input order.
+        """
+        if not self.docs:
+            return [[] for _ in queries]
+
+        if prune:
+            results = []
+            for query in queries:
+                top, top_scores = maxscore_top_k(self, self.query_terms(query), num_results)
+                results.append(
+                    [(score, self.docs[i]) for i, score in zip(top.tolist(), top_scores.tolist())]
+                )
+            return results
+
+        scores = self.query_matrix(queries) @ self.term_doc_matrix
+
+        results = []
+        for row in range(len(queries)):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            doc_ids, row_scores = scores.indices[start:end], scores.data[start:end]
+            positive = row_scores > 0
+            doc_ids, row_scores = doc_ids[positive], row_scores[positive]
+            top = self.top_k(doc_ids, row_scores, num_results)
+            by_id = dict(zip(doc_ids.tolist(), row_scores.tolist()))
+            results.append([(by_id[i], self.docs[i]) for i in top.tolist()])
+
+        return results
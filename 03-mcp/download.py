@@ -0,0 +1,279 @@
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from typing import Any
+
+import httpx
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _read_meta(meta_path: str) -> dict:
+    """Read a download metadata sidecar, returning {} if missing or invalid."""
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def _write_meta(meta_path: str, meta: dict) -> None:
+    """Atomically write a download metadata sidecar."""
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _remove(*paths: str) -> None:
+    """Remove files, ignoring the ones that do not exist."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _hash_file(path: str) -> Any:
+    """Return a SHA-256 hasher primed with the contents of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+def _write_chunk(f: Any, digest: Any, chunk: bytes) -> None:
+    """Hash a downloaded chunk and append it to the partial file."""
+    digest.update(chunk)
+    f.write(chunk)
+
+
+def _cached_checksum(file_path: str, meta: dict) -> str:
+    """
+    Return the SHA-256 of a cached archive.
+
+    The digest recorded in the sidecar is reused only while the file keeps the
+    size and mtime recorded with it; an archive replaced in place is rehashed.
+    """
+    stat = os.stat(file_path)
+    if (
+        meta.get("sha256")
+        and meta.get("size") == stat.st_size
+        and meta.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return meta["sha256"]
+    return _hash_file(file_path).hexdigest()
+
+
+async def download_archive(
+    client: httpx.AsyncClient,
+    url: str,
+    path: str,
+    filename: str,
+    sha256: str | None = None,
+) -> str:
+    """
+    Download or revalidate a single archive.
+
+    A cached archive is revalidated with If-None-Match / If-Modified-Since and kept
+    on 304. An interrupted download left in `<filename>.part` is resumed with a Range
+    request guarded by If-Range. The SHA-256 is computed while streaming; hashing
+    and file writes run in worker threads so they do not block the event loop.
+
+    Args:
+        client (httpx.AsyncClient): Shared HTTP client.
+        url (str): URL of the archive.
+        path (str): Local directory where the archive is stored.
+        filename (str): Archive file name.
+        sha256 (str | None): Expected checksum; verified when provided.
+
+    Returns:
+        str: Hex SHA-256 digest of the archive on disk.
+
+    Raises:
+        ValueError: If the downloaded archive does not match `sha256`.
+        httpx.HTTPError: If the request fails.
+    """
+    file_path = os.path.join(path, filename)
+    meta_path = f"{file_path}.json"
+    part_path = f"{file_path}.part"
+    part_meta_path = f"{part_path}.json"
+
+    meta = _read_meta(meta_path) if os.path.exists(file_path) else {}
+    part_meta = _read_meta(part_meta_path) if os.path.exists(part_path) else {}
+
+    headers: dict[str, str] = {}
+    offset = 0
+
+    validator = part_meta.get("etag") or part_meta.get("last_modified")
+    if part_meta.get("url") == url and validator:
+        offset = os.path.getsize(part_path)
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+    elif meta.get("url") == url:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            checksum = await asyncio.to_thread(_cached_checksum, file_path, meta)
+            if sha256 and checksum != sha256:
+                raise ValueError(f"Checksum mismatch for cached {filename}")
+            return checksum
+
+        response.raise_for_status()
+
+        resumed = response.status_code == 206
+        content_range = response.headers.get("Content-Range", "")
+        restart = resumed and not content_range.startswith(f"bytes {offset}-")
+
+        if not restart:
+            if resumed:
+                digest = await asyncio.to_thread(_hash_file, part_path)
+                mode = "ab"
+            else:
+                # Full body: either nothing to resume or If-Range failed
+                digest = hashlib.sha256()
+                mode = "wb"
+                _write_meta(
+                    part_meta_path,
+                    {
+                        "url": url,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    },
+                )
+
+            with open(part_path, mode) as f:
+                # Hashing and disk writes run off the event loop
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    await asyncio.to_thread(_write_chunk, f, digest, chunk)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    if restart:
+        # The server answered a different range than asked for; start over
+        _remove(part_path, part_meta_path)
+        return await download_archive(client, url, path, filename, sha256=sha256)
+
+    checksum = digest.hexdigest()
+    if sha256 and checksum != sha256:
+        _remove(part_path, part_meta_path)
+        raise ValueError(f"Checksum mismatch for {filename}: {checksum} != {sha256}")
+
+    os.replace(part_path, file_path)
+    _remove(part_meta_path)
+    stat = os.stat(file_path)
+    _write_meta(
+        meta_path,
+        {
+            "url": url,
+            "etag": etag or part_meta.get("etag"),
+            "last_modified": last_modified or part_meta.get("last_modified"),
+            "sha256": checksum,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        },
+    )
+    return checksum
+
+
+async def download_archives(
+    downloads: list[dict],
+    path: str,
+    max_concurrency: int = 4,
+    timeout: float = 30,
+) -> dict[str, str]:
+    """
+    Download or revalidate several archives concurrently over one pooled client.
+
+    If a request fails but a previously downloaded archive exists, the cached copy
+    is kept so the server can still start offline.
+
+    Args:
+        downloads (list[dict]): Entries with 'url', 'filename' and optional 'sha256'.
+        path (str): Local directory where archives are stored.
+        max_concurrency (int): Maximum number of simultaneous downloads.
+        timeout (float): Per-request timeout in seconds.
+
+    Returns:
+        dict[str, str]: SHA-256 digest of each archive, keyed by filename.
+    """
+    os.makedirs(path, exist_ok=True)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limits = httpx.Limits(
+        max_connections=max_concurrency,
+        max_keepalive_connections=max_concurrency,
+    )
+
+    async with httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=timeout,
+        limits=limits,
+    ) as client:
+
+        async def fetch(download: dict) -> str:
+            filename = download["filename"]
+            file_path = os.path.join(path, filename)
+
+            async with semaphore:
+                try:
+                    return await download_archive(
+                        client,
+                        download["url"],
+                        path,
+                        filename,
+                        sha256=download.get("sha256"),
+                    )
+                except httpx.HTTPError as exc:
+                    if not os.path.exists(file_path):
+                        raise
+                    print(
+                        f"  Could not refresh {filename} ({exc}); using cached copy",
+                        file=sys.stderr,
+                    )
+                    meta = _read_meta(f"{file_path}.json")
+                    return await asyncio.to_thread(_cached_checksum, file_path, meta)
+
+        checksums = await asyncio.gather(*(fetch(d) for d in downloads))
+
+    return {d["filename"]: checksum for d, checksum in zip(downloads, checksums)}
+
+
+def download_zip_files(
+    downloads: list[dict],
+    path: str,
+    max_concurrency: int = 4,
+    timeout: float = 30,
+) -> dict[str, str]:
+    """
+    Synchronous wrapper around `download_archives` for startup code.
+
+    Args:
+        downloads (list[dict]): Entries with 'url', 'filename' and optional 'sha256'.
+        path (str): Local directory where archives are stored.
+        max_concurrency (int): Maximum number of simultaneous downloads.
+        timeout (float): Per-request timeout in seconds.
+
+    Returns:
+        dict[str, str]: SHA-256 digest of each archive, keyed by filename.
+    """
+    for download in downloads:
+        if not download["filename"].endswith(".zip"):
+            raise ValueError("Filename must end with .zip")
+
+    return asyncio.run(
+        download_archives(
+            downloads,
+            path,
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+        )
+    )
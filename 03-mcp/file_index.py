@@ -0,0 +1,147 @@
+import bisect
+import fnmatch
+import heapq
+import re
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from pathlib import PurePosixPath
+
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+class FileIndex:
+    """
+    Lookup structures over the (repo, filename) pairs of the indexed documents.
+
+    - `paths` maps an exact path to the repos containing it.
+    - `suffixes` maps every trailing run of path components ("server.md",
+      "python-sdk/server.md", ...) to the matching (repo, filename) pairs, which
+      also covers basename lookups.
+    - `sorted_paths` keeps the distinct paths sorted for prefix and glob matching.
+
+    With a `base` index, these only hold the keys given here and every lookup
+    also covers the base, so a small layer that is rebuilt often (the scraped
+    web pages) can sit on top of a large one without copying it.
+    """
+
+    def __init__(self, keys: Iterable[tuple[str, str]] = (), base: "FileIndex | None" = None):
+        self.base = base
+        self.paths: dict[str, list[str]] = defaultdict(list)
+        self.suffixes: dict[str, list[tuple[str, str]]] = defaultdict(list)
+        self.sorted_paths: list[str] = []
+
+        for repo, filename in keys:
+            self.paths[filename].append(repo)
+            parts = PurePosixPath(filename).parts
+            for i in range(len(parts)):
+                self.suffixes["/".join(parts[i:])].append((repo, filename))
+
+        self.sorted_paths = sorted(self.paths)
+
+    def __getstate__(self) -> dict:
+        return {
+            "paths": dict(self.paths),
+            "suffixes": dict(self.suffixes),
+            "sorted_paths": self.sorted_paths,
+            "base": self.base,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.base = state.get("base")
+        self.paths = defaultdict(list, state["paths"])
+        self.suffixes = defaultdict(list, state["suffixes"])
+        self.sorted_paths = state["sorted_paths"]
+
+    def _layers(self) -> list["FileIndex"]:
+        """Return this index and the chain of indexes below it."""
+        layers, layer = [], self
+        while layer is not None:
+            layers.append(layer)
+            layer = layer.base
+        return layers
+
+    def resolve(self, filename: str, repo: str | None = None) -> list[tuple[str, str]]:
+        """
+        Resolve a possibly partial path to matching (repo, filename) pairs.
+
+        Exact paths win; otherwise the name is matched as a trailing run of path
+        components, e.g. "server.md" or "sdk/server.md". With a `repo`, only
+        that repository is considered, so an exact path elsewhere does not hide
+        a suffix match inside it.
+
+        Args:
+            filename (str): Exact path, suffix path or basename.
+            repo (str | None): Only match files of this repository.
+
+        Returns:
+            list[tuple[str, str]]: Sorted matches (empty if none).
+        """
+        filename = filename.strip("/")
+        layers = self._layers()
+        repos = [
+            r
+            for layer in layers
+            for r in layer.paths.get(filename, ())
+            if repo is None or r == repo
+        ]
+        if repos:
+            return sorted((r, filename) for r in repos)
+        return sorted(
+            (r, f)
+            for layer in layers
+            for r, f in layer.suffixes.get(filename, ())
+            if repo is None or r == repo
+        )
+
+    def find(self, pattern: str, limit: int = 50) -> list[tuple[str, str]]:
+        """
+        Find files by path prefix or glob pattern.
+
+        A pattern without glob characters is a prefix match. For globs, the literal
+        prefix before the first wildcard narrows the candidates with a binary
+        search before `fnmatch` is applied. Patterns without a "/" are also
+        matched against basenames.
+
+        Args:
+            pattern (str): Path prefix or glob (e.g. "docs/servers/", "*.mdx").
+            limit (int): Maximum number of results.
+
+        Returns:
+            list[tuple[str, str]]: Matching (repo, filename) pairs, sorted by path.
+        """
+        pattern = pattern.lstrip("/")
+        wildcard = GLOB_CHARS.search(pattern)
+        prefix = pattern[: wildcard.start()] if wildcard else pattern
+
+        # Bare basename globs ("*.mdx", "server*") must look at every path
+        basename_glob = wildcard is not None and "/" not in pattern
+        if basename_glob:
+            prefix = ""
+
+        layers = self._layers()
+        matches: list[tuple[str, str]] = []
+        previous = None
+
+        # Walk the sorted paths of all layers at once, from the prefix on
+        for path in heapq.merge(*(layer._paths_from(prefix) for layer in layers)):
+            if not path.startswith(prefix):
+                break
+            if path == previous:
+                continue  # the same path in several layers
+            previous = path
+            if wildcard is not None:
+                target = PurePosixPath(path).name if basename_glob else path
+                if not fnmatch.fnmatchcase(target, pattern):
+                    continue
+            repos = sorted(repo for layer in layers for repo in layer.paths.get(path, ()))
+            matches.extend((repo, path) for repo in repos)
+            if len(matches) >= limit:
+                break
+
+        return matches[:limit]
+
+    def _paths_from(self, prefix: str) -> Iterator[str]:
+        """Yield the sorted paths of this layer, from the first >= `prefix`."""
+        start = bisect.bisect_left(self.sorted_paths, prefix)
+        for i in range(start, len(self.sorted_paths)):
+            yield self.sorted_paths[i]
@@ -0,0 +1,70 @@
+import multiprocessing
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from search import iter_docs_from_zip_file
+
+
+def ingest_repo(zips_dir: str, repo: dict) -> list[dict[str, str]]:
+    """
+    Read and annotate all documents of one downloaded repository.
+
+    Args:
+        zips_dir (str): Directory containing the repository ZIP files.
+        repo (dict): Repository entry from the server config.
+
+    Returns:
+        list[dict[str, str]]: Documents with 'filename', 'content' and 'repo' fields.
+    """
+    repo_name = repo["name"]
+
+    return [
+        {**doc, "repo": repo_name}
+        for doc in iter_docs_from_zip_file(
+            zips_dir,
+            f"{repo_name}.zip",
+            extensions=repo.get("docs_extensions"),
+        )
+    ]
+
+
+def iter_ingest_repos(
+    zips_dir: str,
+    repos: list[dict],
+    workers: int = 1,
+) -> Iterator[tuple[dict, list[dict[str, str]]]]:
+    """
+    Ingest several repositories and yield each one as soon as it is done.
+
+    Completion order depends on scheduling; callers that need a deterministic
+    result must re-order by repository.
+
+    Args:
+        zips_dir (str): Directory containing the repository ZIP files.
+        repos (list[dict]): Repository entries from the server config.
+        workers (int): Number of worker processes; 1 ingests in-process.
+
+    Yields:
+        tuple[dict, list[dict[str, str]]]: (repository entry, its documents).
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    if workers == 1 or len(repos) < 2:
+        for repo in repos:
+            yield repo, ingest_repo(zips_dir, repo)
+        return
+
+    with _process_pool(workers, len(repos)) as pool:
+        futures = {pool.submit(ingest_repo, zips_dir, repo): repo for repo in repos}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _process_pool(workers: int, jobs: int) -> ProcessPoolExecutor:
+    """Create a pool that is safe to start from a multi-threaded server."""
+    # fork() from a process that already runs threads can deadlock the children
+    return ProcessPoolExecutor(
+        max_workers=min(workers, jobs),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
@@ -1,17 +1,41 @@
+import asyncio
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import quote
 
+import uvicorn
 from fastmcp import FastMCP
 
 from config import create_config
-from scrape import fetch_page
+from download import download_zip_files
+from file_index import FileIndex
+from ingest import iter_ingest_repos
+from metrics import ToolMetrics
+from passages import build_outline, normalize_language, split_code_blocks, split_documents
+from postings import CompactIndex
+from query_cache import QueryCache
+from page_cache import PageCache
+from scrape import JINA_READER_PREFIX, PageFetcher
 from search import (
-    download_zip_file_from_url,
-    discover_zip_root,
-    parse_zip_file,
-    create_docs_from_zip_file,
     create_search_index,
-    search_index,
+    diff_manifests,
+    index_stats,
+    iter_docs_from_zip_file,
+    read_zip_manifest,
+    search_shards,
 )
+from snippets import MAX_SCAN_BYTES, make_snippet, query_pattern, sentence_starts
+from snapshot import file_checksum, snapshot_key, load_snapshot, save_snapshot
+from state import IndexState, IngestProgress
+from store import DocumentStore
+from web_corpus import WEB_REPO, WebCorpus
 
 # ---------------------------------------------------------------------
 # MCP initialization
@@ -19,142 +43,1598 @@ from search import (
 
 mcp = FastMCP("AI Dev Tools Zoomcamp MCP")
 
-print("Starting MCP server...")
+
+def log(message: str) -> None:
+    """Print a progress message to stderr (stdout carries the MCP protocol)."""
+    print(message, file=sys.stderr, flush=True)
+
 
 # ---------------------------------------------------------------------
 # Load configuration
 # ---------------------------------------------------------------------
 
-config = create_config("server_config.yaml")
+CONFIG_PATH = "server_config.yaml"
+
+config = create_config(CONFIG_PATH)
 
 zips_dir = config["storage"]["zips_dir"]
-snippet_size = config.get("search", {}).get("snippet_size", 300)
+snapshots_dir = config["storage"].get("snapshots_dir", "data/snapshots")
+document_storage = config["storage"].get("documents", "archive")
+document_cache_size = config["storage"].get("document_cache_size", 256)
+search_config = config.get("search", {})
+snippet_size = search_config.get("snippet_size", 300)
+query_snippets = search_config.get("query_snippets", False)
+snippet_highlight = search_config.get("snippet_highlight", "**")
 repos = config["repos"]
+ingest_config = config.get("ingest", {})
+ingest_workers = ingest_config.get("workers", 1)
+partial_results = ingest_config.get("partial_results", True)
+download_config = config.get("download", {})
+watch_config = config.get("watch", {})
+stats_config = config.get("stats", {})
+scrape_config = config.get("scrape", {})
+tools_config = config.get("tools", {})
+server_config = config.get("server", {})
+
+# ---------------------------------------------------------------------
+# Index state
+# ---------------------------------------------------------------------
 
-Path(zips_dir).mkdir(parents=True, exist_ok=True)
+# Replaced wholesale by the ingestion thread; tools read it once per call
+state = IndexState()
+progress = IngestProgress()
 
-print(f"Configured repositories: {len(repos)}")
+# Results are cached per searched shards, so replacing a shard invalidates them
+query_cache = QueryCache(max_size=config.get("cache", {}).get("max_queries", 1024))
+
+# Per-tool latency histograms, reported by server_stats
+tool_metrics = ToolMetrics()
+
+# Searches fan out over the per-repo index shards in this pool
+search_executor = ThreadPoolExecutor(
+    max_workers=search_config.get("shard_workers", 4), thread_name_prefix="search"
+)
+
+# Tool calls run their CPU-bound work (scoring, decoding) in this bounded pool,
+# so the event loop keeps serving other clients
+tool_executor = ThreadPoolExecutor(
+    max_workers=tools_config.get("workers", 8), thread_name_prefix="tool"
+)
 
 # ---------------------------------------------------------------------
-# Ingest repositories and collect documents
+# Page fetching
 # ---------------------------------------------------------------------
 
-all_documents: list[dict[str, str]] = []
-doc_lookup: dict[tuple[str, str], str] = {}
+page_cache_config = scrape_config.get("cache", {})
+page_cache = (
+    PageCache(
+        page_cache_config.get("dir", "data/scrape_cache"),
+        ttl=page_cache_config.get("ttl", 86_400),
+        max_bytes=int(page_cache_config.get("max_mb", 100) * 1024 * 1024),
+    )
+    if page_cache_config.get("enabled", True)
+    else None
+)
+page_fetcher = PageFetcher(
+    reader_prefix=scrape_config.get("reader_prefix", JINA_READER_PREFIX),
+    timeout=scrape_config.get("timeout", 30),
+    max_connections=scrape_config.get("max_concurrency", 8),
+    cache=page_cache,
+)
+
+# Scraped pages optionally become searchable under the synthetic "web" repo
+web_index_config = scrape_config.get("index", {})
+web_corpus = (
+    WebCorpus(
+        max_pages=web_index_config.get("max_pages", 200),
+        max_bytes=int(web_index_config.get("max_mb", 20) * 1024 * 1024),
+        max_page_bytes=int(web_index_config.get("max_page_kb", 512) * 1024),
+    )
+    if web_index_config.get("enabled", False)
+    else None
+)
+if web_corpus is not None and search_config.get("backend", "minsearch") != "bm25":
+    log("scrape.index needs search.backend: bm25; scraped pages will not be indexed")
+    web_corpus = None
+# HTTP workers would each index only the pages scraped through them
+if web_corpus is not None and server_config.get("transport", "stdio") == "http" and (
+    server_config.get("workers", 1) > 1
+):
+    log("scrape.index is not shared between server.workers; scraped pages will not be indexed")
+    web_corpus = None
+
+# Repository shards can be stored as memory-mapped compact postings files
+compact_shards = search_config.get("compact", False)
+if compact_shards and search_config.get("backend", "minsearch") != "bm25":
+    log("search.compact needs search.backend: bm25; shards will stay in memory")
+    compact_shards = False
+shards_dir = Path(snapshots_dir) / "shards"
+
+# Sparse bm25 shards can skip documents that cannot reach the top k (same results)
+search_pruning = search_config.get("pruning", False)
+
+# Fenced code blocks get their own per-language shards, searched by search_code
+code_blocks = search_config.get("code_blocks", False)
+code_max_bytes = search_config.get("code_max_bytes", 4000)
+
+
+def publish(new_state: IndexState) -> None:
+    """Atomically make a new index state visible to tool calls."""
+    global state
+    state = new_state
+
+
+# Serializes the updates that derive a new ready state from the published one
+state_lock = threading.Lock()
 
-for repo in repos:
-    repo_name = repo["name"]
-    repo_url = repo["url"]
-    branch = repo.get("branch", "master")
-    md_extensions = repo.get("docs_extensions")
 
-    zip_filename = f"{repo_name}.zip"
+def archive_url(repo: dict) -> str:
+    """Return the GitHub archive URL of a configured repository."""
+    return f"{repo['url']}/archive/refs/heads/{repo.get('branch', 'master')}.zip"
 
-    print(f"\nIndexing repository: {repo_name}")
 
-    # 1. Download ZIP (idempotent)
-    print("  Downloading ZIP...")
-    download_zip_file_from_url(
-        f"{repo_url}/archive/refs/heads/{branch}.zip",
+def download_repo_archives(repo_list: list[dict]) -> dict[str, str]:
+    """
+    Download or revalidate the archives of several repositories concurrently.
+
+    Args:
+        repo_list (list[dict]): Repository entries from the server config.
+
+    Returns:
+        dict[str, str]: SHA-256 of each archive, keyed by repository name.
+    """
+    checksums = download_zip_files(
+        [
+            {
+                "url": archive_url(repo),
+                "filename": f"{repo['name']}.zip",
+                "sha256": repo.get("sha256"),
+            }
+            for repo in repo_list
+        ],
         zips_dir,
-        zip_filename,
+        max_concurrency=download_config.get("concurrency", 4),
+        timeout=download_config.get("timeout", 30),
     )
-    print(f"  ZIP ready: {zip_filename}")
+    return {repo["name"]: checksums[f"{repo['name']}.zip"] for repo in repo_list}
 
-    # 2. Discover ZIP root
-    root_dir = discover_zip_root(zips_dir, zip_filename)
 
-    # 3. Parse markdown files
-    md_file_paths = parse_zip_file(
-        zips_dir,
-        zip_filename,
-        extensions=md_extensions,
+def snapshot_keys(
+    repo_list: list[dict], checksums: dict[str, str]
+) -> tuple[dict[str, str], str]:
+    """Return the per-repo snapshot keys and the full index snapshot key."""
+    # A repo snapshot is only valid for this exact archive and extension set
+    repo_keys = {
+        repo["name"]: snapshot_key(
+            checksum=checksums[repo["name"]],
+            docs_extensions=repo.get("docs_extensions"),
+            search=search_config,
+        )
+        for repo in repo_list
+    }
+    index_key = snapshot_key(
+        repos=repo_keys,
+        search=search_config,
+        documents=document_storage,
     )
-    print(f"  Found {len(md_file_paths)} markdown files")
+    return repo_keys, index_key
 
-    # 4. Read contents
-    documents = create_docs_from_zip_file(
-        zips_dir,
-        zip_filename,
-        root_dir,
-        md_file_paths,
+
+def store_documents(
+    document_store: DocumentStore, repo_name: str, documents: list[dict[str, str]]
+) -> None:
+    """Add the documents of one repository, with their outlines, to a document store."""
+    for doc in documents:
+        outline = build_outline(doc["content"])
+        sentences = sentence_starts(doc["content"]) if query_snippets else None
+        if document_storage == "archive":
+            document_store.add_archive_document(
+                repo_name,
+                doc["filename"],
+                str(Path(zips_dir) / f"{repo_name}.zip"),
+                content=doc["content"],
+                outline=outline,
+                sentences=sentences,
+            )
+        else:
+            document_store.add_text(
+                repo_name, doc["filename"], doc["content"], outline=outline, sentences=sentences
+            )
+
+
+def repo_manifest(repo: dict) -> dict[str, tuple[int, int]]:
+    """Read the (CRC32, size) manifest of a repository archive."""
+    return read_zip_manifest(
+        zips_dir, f"{repo['name']}.zip", extensions=repo.get("docs_extensions")
+    )
+
+
+def fit_shard(documents: list[dict[str, str]]):
+    """
+    Fit the index shard of one repository.
+
+    With passage indexing the shard holds heading-delimited passages, whose
+    text is dropped once fitted; the documents keep theirs.
+    """
+    # Index heading-delimited passages so hits point at the matching section
+    if search_config.get("passages", False):
+        index_documents = split_documents(documents)
+    else:
+        index_documents = documents
+
+    shard = create_search_index(
+        index_documents,
+        backend=search_config.get("backend", "minsearch"),
+        field_weights=search_config.get("field_weights"),
+    )
+    if index_documents is not documents:
+        for doc in index_documents:
+            doc.pop("content", None)
+    return shard
+
+
+def code_blocks_by_language(documents: list[dict[str, str]]) -> dict[str, list[dict]]:
+    """Extract the fenced code blocks of some documents, grouped by language."""
+    by_language: dict[str, list[dict]] = {}
+    for block in split_code_blocks(documents):
+        by_language.setdefault(block["language"], []).append(block)
+    return by_language
+
+
+def fit_code_shard(blocks: list[dict]):
+    """Fit the shard of some code blocks, dropping their text once fitted."""
+    shard = create_search_index(
+        blocks,
+        backend=search_config.get("backend", "minsearch"),
+        field_weights=search_config.get("field_weights"),
+    )
+    for block in blocks:
+        block.pop("content", None)
+    return shard
+
+
+def fit_code_shards(documents: list[dict[str, str]]) -> dict:
+    """
+    Fit the code block shards of one repository, one per language.
+
+    Returns an empty dict unless `search.code_blocks` is set. `search_code`
+    reads the code itself from the document store.
+    """
+    if not code_blocks:
+        return {}
+
+    by_language = code_blocks_by_language(documents)
+    return {language: fit_code_shard(by_language[language]) for language in sorted(by_language)}
+
+
+def update_code_shards(
+    code_shards: dict, documents: list[dict[str, str]], removed_keys: set[tuple[str, str]]
+) -> dict:
+    """
+    Apply added and removed documents to the code block shards of one repository.
+
+    Existing shards are updated without a refit, like repository shards; a
+    language seen for the first time gets a new shard, and languages left
+    without blocks are dropped.
+    """
+    if not code_blocks:
+        return {}
+
+    by_language = code_blocks_by_language(documents)
+    updated = {}
+    for language in sorted(set(code_shards) | set(by_language)):
+        blocks = by_language.get(language, [])
+        if language in code_shards:
+            shard = code_shards[language].updated(blocks, removed_keys)
+            for block in blocks:
+                block.pop("content", None)
+        else:
+            shard = fit_code_shard(blocks)
+        if len(shard.docs):
+            updated[language] = shard
+    return updated
+
+
+def compact_code_shards(repo_name: str, code_shards: dict, key: str) -> dict:
+    """Compact the code block shards of a repository (see `compact_shard`)."""
+    return {
+        language: compact_shard(f"{repo_name}.code.{quote(language, safe='')}", shard, key)
+        for language, shard in code_shards.items()
+    }
+
+
+def compact_shard(repo_name: str, shard, key: str):
+    """
+    Write a fitted bm25 shard as a compact postings file and map it read-only.
+
+    Does nothing unless `search.compact` is set. The file name includes `key`,
+    so every process serving the same snapshot maps the same file.
+    """
+    if not compact_shards:
+        return shard
+
+    path = shards_dir / f"{repo_name}-{key[:16]}.idx"
+    CompactIndex.from_bm25(shard).save(str(path))
+    return CompactIndex.load(str(path))
+
+
+def prune_shard_files(shards: list) -> None:
+    """Delete compact shard files the given shards do not map."""
+    if not shards_dir.is_dir():
+        return
+
+    in_use = {Path(shard.path) for shard in shards if isinstance(shard, CompactIndex)}
+    for path in shards_dir.glob("*.idx"):
+        if path not in in_use:
+            # Processes still mapping it keep their pages until they unmap
+            path.unlink(missing_ok=True)
+
+
+def order_shards(shards: dict, repo_names: list[str]) -> dict:
+    """Return the shards in config order, with the web shard last."""
+    return {name: shards[name] for name in [*repo_names, WEB_REPO] if name in shards}
+
+
+def build_state(
+    repo_list: list[dict],
+    checksums: dict[str, str],
+    publish_partial: bool = False,
+) -> IndexState:
+    """
+    Build a complete index state for the given repositories.
+
+    Each repository gets its own index shard. Repositories whose archive and
+    settings are unchanged are loaded, shard included, from their snapshots;
+    only the others are decoded and fitted. If the whole index is unchanged,
+    its snapshot is loaded and nothing is fitted.
+
+    Args:
+        repo_list (list[dict]): Repository entries from the server config.
+        checksums (dict[str, str]): Archive checksum of each repository.
+        publish_partial (bool): Publish each repository as soon as its shard is
+            fitted.
+
+    Returns:
+        IndexState: The ready state (not yet published).
+    """
+    repo_keys, index_key = snapshot_keys(repo_list, checksums)
+    index_snapshot_path = str(Path(snapshots_dir) / "index.pkl")
+
+    index_snapshot = load_snapshot(index_snapshot_path, index_key)
+    if index_snapshot is not None:
+        # Warm start: nothing changed since the last build
+        progress.update(
+            repos_indexed=len(repo_list),
+            documents=len(index_snapshot["documents"]),
+        )
+        log("Loaded search index snapshot")
+        return state_from_snapshot(index_snapshot, tuple(repo["name"] for repo in repo_list))
+
+    # Ingest repositories, publishing each one as soon as its shard is fitted
+    progress.update(stage="ingesting")
+    document_store = DocumentStore(cache_size=document_cache_size)
+    repo_documents: dict[str, list[dict[str, str]]] = {}
+    shards: dict = {}
+    code_shards: dict = {}
+    stale_repos: list[dict] = []
+
+    def add_repo(
+        repo_name: str, documents: list[dict[str, str]], shard, repo_code_shards: dict
+    ) -> None:
+        store_documents(document_store, repo_name, documents)
+
+        # Contents are served from the document store; drop the decoded text
+        for doc in documents:
+            doc.pop("content", None)
+
+        repo_documents[repo_name] = documents
+        shards[repo_name] = shard
+        code_shards[repo_name] = repo_code_shards
+
+        if publish_partial:
+            publish(
+                IndexState(
+                    shards=dict(shards),
+                    code_shards=dict(code_shards),
+                    documents=[d for docs in repo_documents.values() for d in docs],
+                    document_store=document_store,
+                    file_index=FileIndex(document_store.keys()),
+                    repos=tuple(repo_documents),
+                )
+            )
+
+        progress.repo_done(len(documents))
+        log(f"  {repo_name}: {len(documents)} documents ready")
+
+    for repo in repo_list:
+        repo_name = repo["name"]
+        repo_snapshot_path = str(Path(snapshots_dir) / f"{repo_name}.pkl")
+
+        repo_snapshot = load_snapshot(repo_snapshot_path, repo_keys[repo_name])
+        if repo_snapshot is not None:
+            add_repo(
+                repo_name,
+                repo_snapshot["documents"],
+                repo_snapshot["shard"],
+                repo_snapshot["code_shards"],
+            )
+        else:
+            stale_repos.append(repo)
+
+    if stale_repos:
+        log(f"Indexing {len(stale_repos)} repositories with {ingest_workers} worker(s)...")
+
+    # Discover root, filter and decode each archive in a single pass
+    for repo, documents in iter_ingest_repos(zips_dir, stale_repos, workers=ingest_workers):
+        repo_key = repo_keys[repo["name"]]
+        shard = compact_shard(repo["name"], fit_shard(documents), repo_key)
+        repo_code_shards = compact_code_shards(repo["name"], fit_code_shards(documents), repo_key)
+        save_snapshot(
+            str(Path(snapshots_dir) / f"{repo['name']}.pkl"),
+            repo_key,
+            {"documents": documents, "shard": shard, "code_shards": repo_code_shards},
+        )
+        add_repo(repo["name"], documents, shard, repo_code_shards)
+
+    repo_names = [repo["name"] for repo in repo_list]
+    new_state = IndexState(
+        # Merged in config order so the result does not depend on scheduling
+        shards=order_shards(shards, repo_names),
+        code_shards=order_shards(code_shards, repo_names),
+        documents=[doc for name in repo_names for doc in repo_documents[name]],
+        document_store=document_store,
+        file_index=FileIndex(document_store.keys()),
+        repos=tuple(repo_names),
+        manifests={repo["name"]: repo_manifest(repo) for repo in repo_list},
+        ready=True,
+    )
+    save_state_snapshot(new_state, index_key)
+    return new_state
+
+
+def state_from_snapshot(index_snapshot: dict, repo_names: tuple[str, ...]) -> IndexState:
+    """Rebuild a ready state from the payload of a full index snapshot."""
+    document_store = index_snapshot["document_store"]
+    document_store.cache_size = document_cache_size
+    return IndexState(
+        shards=index_snapshot["shards"],
+        code_shards=index_snapshot["code_shards"],
+        documents=index_snapshot["documents"],
+        document_store=document_store,
+        file_index=index_snapshot["file_index"],
+        repos=repo_names,
+        manifests=index_snapshot["manifests"],
+        ready=True,
+    )
+
+
+def save_state_snapshot(new_state: IndexState, index_key: str) -> None:
+    """Save a ready state as the full index snapshot, without scraped pages."""
+    progress.update(stage="saving")
+
+    # Scraped pages belong to this process and are never persisted
+    document_store, file_index = new_state.document_store, new_state.file_index
+    web_keys = [key for key in document_store.keys() if key[0] == WEB_REPO]
+    if web_keys or file_index.base is not None:
+        document_store = document_store.copy()
+        for repo_name, filename in web_keys:
+            document_store.remove(repo_name, filename)
+        file_index = FileIndex(document_store.keys())
+
+    save_snapshot(
+        str(Path(snapshots_dir) / "index.pkl"),
+        index_key,
+        {
+            "shards": {
+                name: shard for name, shard in new_state.shards.items() if name != WEB_REPO
+            },
+            "code_shards": new_state.code_shards,
+            "documents": [doc for doc in new_state.documents if doc["repo"] != WEB_REPO],
+            "document_store": document_store,
+            "file_index": file_index,
+            "manifests": new_state.manifests,
+        },
+    )
+    code_shards = [
+        shard for by_language in new_state.code_shards.values() for shard in by_language.values()
+    ]
+    prune_shard_files([*new_state.shards.values(), *code_shards])
+
+
+def update_state(
+    current: IndexState,
+    repo_list: list[dict],
+    checksums: dict[str, str],
+    changed: set[str],
+) -> IndexState:
+    """
+    Apply refreshed archives to a ready state without refitting the index.
+
+    The (CRC32, size) manifest of each changed archive is diffed against the one
+    recorded at the last build; only added and modified entries are decoded, and
+    only those documents (and removed ones) are applied to a copy of the shard
+    of their repository, the document store and the file index. The shards of
+    other repositories are shared with `current`. Requires the bm25 backend.
+
+    Per-repo snapshots of the changed repositories cannot be rewritten (the
+    unchanged documents are not decoded), so they are deleted and the next full
+    build re-ingests those repositories; the full index snapshot is saved as usual.
+
+    Args:
+        current (IndexState): The published, ready state.
+        repo_list (list[dict]): Repository entries of the new configuration.
+        checksums (dict[str, str]): Archive checksum of each repository.
+        changed (set[str]): Names of added or modified repositories.
+
+    Returns:
+        IndexState: The updated state (not yet published).
+    """
+    progress.update(stage="ingesting")
+    document_store = current.document_store.copy()
+    manifests = dict(current.manifests)
+    # Scraped pages are applied again by `sync_web_pages` once this is published
+    shards = {name: shard for name, shard in current.shards.items() if name != WEB_REPO}
+    code_shards = dict(current.code_shards)
+    removed_keys: set[tuple[str, str]] = set()
+    added_documents: list[dict[str, str]] = []
+
+    repo_names = [repo["name"] for repo in repo_list]
+    for repo_name in set(current.repos) - set(repo_names) - {WEB_REPO}:
+        removed_keys.update((repo_name, filename) for filename in manifests.pop(repo_name))
+        shards.pop(repo_name, None)
+        code_shards.pop(repo_name, None)
+
+    for repo in repo_list:
+        repo_name = repo["name"]
+        if repo_name not in changed:
+            continue
+
+        manifest = repo_manifest(repo)
+        added, modified, removed = diff_manifests(manifests.get(repo_name, {}), manifest)
+        removed_keys.update((repo_name, filename) for filename in modified | removed)
+
+        documents = [
+            {**doc, "repo": repo_name}
+            for doc in iter_docs_from_zip_file(
+                zips_dir,
+                f"{repo_name}.zip",
+                extensions=repo.get("docs_extensions"),
+                only=added | modified,
+            )
+        ]
+        added_documents.extend(documents)
+        manifests[repo_name] = manifest
+        log(
+            f"  {repo_name}: {len(added)} added, {len(modified)} changed, "
+            f"{len(removed)} removed"
+        )
+
+    for repo_name, filename in removed_keys:
+        document_store.remove(repo_name, filename)
+
+    progress.update(stage="indexing")
+    index_key = snapshot_keys(repo_list, checksums)[1]
+    for repo_name in changed:
+        repo_added = [doc for doc in added_documents if doc["repo"] == repo_name]
+        repo_removed = {key for key in removed_keys if key[0] == repo_name}
+        store_documents(document_store, repo_name, repo_added)
+        code_shards[repo_name] = compact_code_shards(
+            repo_name,
+            update_code_shards(code_shards.get(repo_name, {}), repo_added, repo_removed),
+            index_key,
+        )
+
+        if repo_name not in shards:
+            shards[repo_name] = compact_shard(repo_name, fit_shard(repo_added), index_key)
+            continue
+
+        if search_config.get("passages", False):
+            index_documents = split_documents(repo_added)
+        else:
+            index_documents = repo_added
+        shards[repo_name] = compact_shard(
+            repo_name,
+            shards[repo_name].updated(index_documents, repo_removed),
+            index_key,
+        )
+        for doc in index_documents:
+            doc.pop("content", None)
+
+    for doc in added_documents:
+        doc.pop("content", None)
+
+    documents = [
+        doc
+        for doc in current.documents
+        if (doc["repo"], doc["filename"]) not in removed_keys
+    ] + added_documents
+    progress.update(repos_indexed=len(repo_list), documents=len(documents))
+
+    new_state = IndexState(
+        shards=order_shards(shards, repo_names),
+        code_shards=order_shards(code_shards, repo_names),
+        documents=documents,
+        document_store=document_store,
+        file_index=FileIndex(document_store.keys()),
+        repos=tuple(repo["name"] for repo in repo_list),
+        manifests=manifests,
+        ready=True,
     )
-    print(f"  Loaded {len(documents)} documents")
+    save_state_snapshot(new_state, index_key)
+    # Their snapshots describe the old archives, whatever key they were saved under
+    for repo_name in changed:
+        (Path(snapshots_dir) / f"{repo_name}.pkl").unlink(missing_ok=True)
+    return new_state
+
+
+def sync_web_pages(current: IndexState) -> IndexState:
+    """
+    Bring the web documents of a ready state in line with the scraped pages.
+
+    Pages that were added or re-scraped with new content are chunked into
+    passages and appended to a copy of the web shard; evicted or outdated pages
+    are removed. Nothing is refitted (see `BM25Index.updated`). Only the web
+    part of the state is rebuilt: the web documents, their store and a file
+    index layered over the repository one. The repository part is shared with
+    `current`, so the cost grows with the number of pages, not the corpus.
+
+    Args:
+        current (IndexState): A state about to be (or already) published.
+
+    Returns:
+        IndexState: The updated state, or `current` if nothing changed.
+    """
+    if web_corpus is None or not current.ready:
+        return current
+
+    pages = web_corpus.snapshot()
+    indexed = {doc["filename"]: doc["version"] for doc in current.web_documents}
+    stale = {
+        filename
+        for filename, version in indexed.items()
+        if filename not in pages or pages[filename][0] != version
+    }
+    fresh = {
+        filename: page
+        for filename, page in pages.items()
+        if indexed.get(filename) != page[0]
+    }
+    if not stale and not fresh:
+        return current
+
+    removed_keys = {(WEB_REPO, filename) for filename in stale}
+    web_store = current.web_store.copy()
+    for repo_name, filename in removed_keys:
+        web_store.remove(repo_name, filename)
 
-    # Annotate documents with repo name
+    documents = [
+        {"repo": WEB_REPO, "filename": filename, "url": url, "version": version, "content": text}
+        for filename, (version, text, url) in fresh.items()
+    ]
     for doc in documents:
-        doc["repo"] = repo_name
-        doc_lookup[(repo_name, doc["filename"])] = doc["content"]
+        web_store.add_text(
+            WEB_REPO,
+            doc["filename"],
+            doc["content"],
+            outline=build_outline(doc["content"]),
+            sentences=sentence_starts(doc["content"]) if query_snippets else None,
+        )
 
-    all_documents.extend(documents)
+    # Scraped pages are often long and flat; bound the passage size
+    index_documents = split_documents(
+        documents, max_bytes=web_index_config.get("passage_bytes", 4000)
+    )
+    shards = dict(current.shards)
+    if WEB_REPO in shards:
+        shards[WEB_REPO] = shards[WEB_REPO].updated(index_documents, removed_keys)
+    else:
+        shards[WEB_REPO] = create_search_index(
+            index_documents,
+            backend="bm25",
+            field_weights=search_config.get("field_weights"),
+        )
+    if not pages:
+        del shards[WEB_REPO]
 
-# ---------------------------------------------------------------------
-# Build search index
-# ---------------------------------------------------------------------
+    for doc in documents:
+        doc.pop("content", None)
+    for doc in index_documents:
+        doc.pop("content", None)
+
+    web_documents = [
+        doc for doc in current.web_documents if doc["filename"] not in stale
+    ] + documents
+
+    # Web files are a layer over the repository files; only the layer is rebuilt
+    repo_files = current.file_index.base if current.web_documents else current.file_index
+    file_index = FileIndex(web_store.keys(), base=repo_files) if web_documents else repo_files
+
+    repo_names = tuple(name for name in current.repos if name != WEB_REPO)
+    return IndexState(
+        shards=shards,
+        code_shards=current.code_shards,
+        documents=current.documents,
+        document_store=current.document_store,
+        file_index=file_index,
+        repos=repo_names + ((WEB_REPO,) if pages else ()),
+        manifests=current.manifests,
+        ready=True,
+        web_documents=web_documents,
+        web_store=web_store,
+    )
+
+
+def index_scraped_pages(pages: list[tuple[str, str]]) -> None:
+    """
+    Add scraped (url, text) pages to the web corpus and the live index.
+
+    Does nothing unless `scrape.index.enabled` is set. Before the first index
+    is ready the pages are only recorded; they are indexed when it is published.
+    """
+    if web_corpus is None or not pages:
+        return
+
+    for url, text in pages:
+        web_corpus.add(url, text)
+
+    with state_lock:
+        new_state = sync_web_pages(state)
+        if new_state is not state:
+            publish(new_state)
+
+
+# Archive checksums and (mtime_ns, size) of the repositories in the published
+# state, recorded when the archives were hashed
+repo_checksums: dict[str, str] = {}
+repo_archive_stats: dict[str, tuple[int, int]] = {}
+
+
+def build_index() -> None:
+    """
+    Download, ingest and index all configured repositories.
+
+    Runs in a background thread. Each repository becomes searchable as soon as
+    its index shard is fitted; the complete state is then swapped in, and a
+    snapshot is saved for the next start.
+    """
+    progress.start(len(repos))
+    log(f"Configured repositories: {len(repos)}")
+
+    log("Downloading repository ZIPs...")
+    checksums = download_repo_archives(repos)
+    stats = archive_stats(repos)
+
+    new_state = build_state(repos, checksums, publish_partial=partial_results)
+    # The watcher starts comparing as soon as the state is ready
+    repo_checksums.update(checksums)
+    repo_archive_stats.update(stats)
+    with state_lock:
+        publish(sync_web_pages(new_state))
+
+    progress.update(stage="ready")
+    log("Search index ready")
+
+
+def archive_stats(repo_list: list[dict]) -> dict[str, tuple[int, int]]:
+    """Return (mtime_ns, size) of each repository archive that exists."""
+    stats = {}
+    for repo in repo_list:
+        zip_path = Path(zips_dir) / f"{repo['name']}.zip"
+        if zip_path.exists():
+            stat = zip_path.stat()
+            stats[repo["name"]] = (stat.st_mtime_ns, stat.st_size)
+    return stats
+
+
+def reload_index(new_repos: list[dict], changed: set[str]) -> None:
+    """
+    Rebuild the index off the request path and swap it in atomically.
+
+    Only `changed` repositories are downloaded (if their config entry changed)
+    or re-hashed (if their archive changed on disk). With the bm25 backend their
+    archive manifests are diffed and only the changed documents are applied to
+    their shards (see `update_state`); otherwise they are re-ingested and
+    refitted, and the other repositories are loaded, shards included, from
+    their snapshots. Tool calls keep using the previous state until the new one
+    is published.
+
+    Args:
+        new_repos (list[dict]): Repository entries of the new configuration.
+        changed (set[str]): Names of added or modified repositories.
+    """
+    global repos
+
+    progress.start(len(new_repos))
+    checksums = {
+        repo["name"]: repo_checksums[repo["name"]]
+        for repo in new_repos
+        if repo["name"] not in changed
+    }
+
+    changed_repos = [repo for repo in new_repos if repo["name"] in changed]
+    old_entries = {repo["name"]: repo for repo in repos}
+    to_download = [repo for repo in changed_repos if repo != old_entries.get(repo["name"])]
+    checksums.update(download_repo_archives(to_download))
+    stats = archive_stats(new_repos)
+
+    # Archives refreshed in place keep their config entry; hash them directly
+    for repo in changed_repos:
+        if repo["name"] not in checksums:
+            checksums[repo["name"]] = file_checksum(str(Path(zips_dir) / f"{repo['name']}.zip"))
+
+    # Archive-only refreshes of the bm25 index are applied as a diff
+    incremental = (
+        state.ready
+        and search_config.get("backend", "minsearch") == "bm25"
+        and all(
+            repo.get("docs_extensions")
+            == old_entries.get(repo["name"], repo).get("docs_extensions")
+            for repo in changed_repos
+        )
+    )
+    if incremental:
+        new_state = update_state(state, new_repos, checksums, changed)
+    else:
+        new_state = build_state(new_repos, checksums)
+
+    with state_lock:
+        publish(sync_web_pages(new_state))
+    repos = new_repos
+    repo_checksums.clear()
+    repo_checksums.update(checksums)
+    repo_archive_stats.clear()
+    repo_archive_stats.update(stats)
+    progress.update(stage="ready")
+    log(f"Reloaded index ({', '.join(sorted(changed)) or 'removed repositories'})")
+
+
+def watch_for_changes(interval: float) -> None:
+    """
+    Poll the config file and the archives, reloading the index on changes.
+
+    Changes to the `repos` section and to archives in `zips_dir` are picked up;
+    other settings still require a restart.
+
+    Args:
+        interval (float): Seconds between checks.
+    """
+    config_path = Path(CONFIG_PATH)
+    config_mtime = config_path.stat().st_mtime_ns
+
+    while True:
+        time.sleep(interval)
+        if not state.ready:
+            continue  # initial ingestion (or a failed one) is still in charge
+
+        try:
+            new_repos = repos
+            mtime = config_path.stat().st_mtime_ns
+            if mtime != config_mtime:
+                config_mtime = mtime
+                new_repos = create_config(CONFIG_PATH)["repos"]
+
+            old_entries = {repo["name"]: repo for repo in repos}
+            current_stats = archive_stats(new_repos)
+            changed = {
+                repo["name"]
+                for repo in new_repos
+                if repo != old_entries.get(repo["name"])
+                or current_stats.get(repo["name"]) != repo_archive_stats.get(repo["name"])
+            }
+            removed = set(old_entries) - {repo["name"] for repo in new_repos}
+
+            if changed or removed:
+                reload_index(new_repos, changed)
+        except Exception as exc:
+            progress.update(stage="ready", error=f"Reload failed: {type(exc).__name__}: {exc}")
+            log(traceback.format_exc())
+
+
+def run_build_index() -> None:
+    """Run `build_index`, recording failures in the progress report."""
+    try:
+        build_index()
+    except Exception as exc:
+        progress.update(stage="failed", error=f"{type(exc).__name__}: {exc}")
+        log(traceback.format_exc())
 
-print(f"\nBuilding search index from {len(all_documents)} documents...")
-index = create_search_index(all_documents)
-print("Search index ready")
+
+def start_background_ingest() -> threading.Thread:
+    """Start building the index in a daemon thread."""
+    thread = threading.Thread(target=run_build_index, name="ingest", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_watcher(interval: float) -> threading.Thread:
+    """Start watching the config and archives in a daemon thread."""
+    thread = threading.Thread(
+        target=watch_for_changes,
+        args=(interval,),
+        name="watch",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+def shards_stats(shards: dict) -> dict:
+    """Sum the size of the index shards, with a per-shard breakdown."""
+    per_shard = {name: index_stats(shard) for name, shard in shards.items()}
+    return {
+        "backend": search_config.get("backend", "minsearch"),
+        "documents": sum(stats["documents"] for stats in per_shard.values()),
+        "vocabulary": sum(stats["vocabulary"] for stats in per_shard.values()),
+        "bytes": sum(stats["bytes"] for stats in per_shard.values()),
+        "shards": per_shard,
+    }
+
+
+def collect_stats() -> dict:
+    """Gather ingestion, tool latency, index, store and cache statistics."""
+    current = state
+    return {
+        "ingest": progress.as_dict(),
+        "tools": tool_metrics.as_dict(),
+        "index": shards_stats(current.shards),
+        "code_index": shards_stats(
+            {
+                f"{repo_name}/{language}": shard
+                for repo_name, by_language in current.code_shards.items()
+                for language, shard in by_language.items()
+            }
+        ),
+        "document_store": current.document_store.stats(),
+        "query_cache": query_cache.stats(),
+        "page_cache": page_cache.stats() if page_cache is not None else None,
+        "web_corpus": web_corpus.stats() if web_corpus is not None else None,
+        "web_store": current.web_store.stats() if web_corpus is not None else None,
+    }
+
+
+def log_stats(interval: float) -> None:
+    """Log `server_stats` as one JSON line every `interval` seconds."""
+    while True:
+        time.sleep(interval)
+        log(json.dumps({"server_stats": collect_stats()}))
+
+
+def start_stats_logger(interval: float) -> threading.Thread:
+    """Start logging statistics periodically in a daemon thread."""
+    thread = threading.Thread(
+        target=log_stats,
+        args=(interval,),
+        name="stats",
+        daemon=True,
+    )
+    thread.start()
+    return thread
 
 # ---------------------------------------------------------------------
 # MCP tools
 # ---------------------------------------------------------------------
 
+def offloaded(func):
+    """
+    Turn a blocking tool function into a coroutine that runs it in `tool_executor`.
+
+    The wrapper keeps the signature and docstring of the function, so it can be
+    registered as an MCP tool, and runs it in a copy of the caller's context.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(tool_executor, call)
+
+    return wrapper
+
+
+def search_scope(current: IndexState, repos: list[str] | None) -> tuple[str, ...]:
+    """Validate a repo filter and return the repositories to search."""
+    if repos is None:
+        return ()
+
+    unknown = [name for name in repos if name not in current.shards]
+    if unknown:
+        pending = "" if current.ready else " (index still building, see server_status)"
+        raise ValueError(
+            f"Unknown repositories: {', '.join(unknown)}; "
+            f"searchable: {', '.join(current.shards) or 'none'}{pending}"
+        )
+    return tuple(sorted(set(repos)))
+
+
+def scoped_shards(current: IndexState, scope: tuple[str, ...] = ()) -> tuple:
+    """
+    Return the shards of a state in `scope` (all of them if empty).
+
+    Search results depend on these shards only, so the tuple is also what the
+    query cache checks its entries against.
+    """
+    return tuple(shard for name, shard in current.shards.items() if not scope or name in scope)
+
+
+def scoped_code_shards(
+    current: IndexState, language: str | None, scope: tuple[str, ...] = ()
+) -> tuple:
+    """Return the code block shards of a state in `scope`, optionally of one language."""
+    return tuple(
+        shard
+        for repo_name, by_language in current.code_shards.items()
+        if not scope or repo_name in scope
+        for shard_language, shard in by_language.items()
+        if language is None or shard_language == language
+    )
+
+
+def search_state(
+    current: IndexState, queries: list[str], top_k: int, scope: tuple[str, ...] = ()
+) -> list[list[dict]]:
+    """Search the shards of a state (only those in `scope`, if given)."""
+    return search_shards(
+        list(scoped_shards(current, scope)),
+        queries,
+        top_k=top_k,
+        executor=search_executor,
+        prune=search_pruning,
+    )
+
+
+def search_code_state(
+    current: IndexState,
+    query: str,
+    top_k: int,
+    language: str | None,
+    scope: tuple[str, ...] = (),
+) -> list[dict]:
+    """Search the code block shards of a state, optionally of one language only."""
+    return search_shards(
+        list(scoped_code_shards(current, language, scope)),
+        [query],
+        top_k=top_k,
+        executor=search_executor,
+        prune=search_pruning,
+    )[0]
+
+
+def format_code_results(current: IndexState, results: list[dict]) -> list[dict]:
+    """Convert ranked code blocks into tool results carrying the code itself."""
+    formatted = []
+    for r in results:
+        length = min(r["end"] - r["start"], code_max_bytes)
+        code = current.store(r["repo"]).read(r["repo"], r["filename"], r["start"], length) or ""
+        formatted.append(
+            {
+                "repo": r["repo"],
+                "filename": r["filename"],
+                "section": r["section"],
+                "language": r["language"],
+                "start": r["start"],
+                "end": r["end"],
+                "code": code,
+                "truncated": r["end"] - r["start"] > length,
+            }
+        )
+    return formatted
+
+
+def resolve_file(current: IndexState, filename: str, repo: str | None) -> tuple[str, str]:
+    """Resolve a possibly partial filename to exactly one (repo, filename) pair."""
+    # Tell callers that a miss may just mean the repo is not ingested yet
+    pending = "" if current.ready else " (index still building, see server_status)"
+
+    matches = current.file_index.resolve(filename, repo)
+    if repo is not None and not matches:
+        raise ValueError(f"File not found: {repo}:{filename}{pending}")
+
+    if not matches:
+        raise ValueError(f"File not found: {filename}{pending}")
+    if len(matches) > 1:
+        candidates = [f"{r}:{f}" for (r, f) in matches]
+        raise ValueError(f"Multiple files match {filename}: {', '.join(candidates)}")
+
+    return matches[0]
+
+
+def document_outline(current: IndexState, repo_name: str, path: str) -> tuple[int, list[dict]]:
+    """Return the size and outline of a document, computing them if not recorded."""
+    recorded = current.store(repo_name).outline(repo_name, path)
+    if recorded is not None:
+        return recorded
+
+    content = current.store(repo_name).get(repo_name, path)
+    if content is None:
+        raise ValueError(f"File not found: {repo_name}:{path}")
+    return len(content.encode("utf-8")), build_outline(content)
+
+
+def find_section(outline: list[dict], section: str, size: int) -> dict | None:
+    """Find a heading by id, passage id ("file#id") or case-insensitive title."""
+    candidates = [section.strip()]
+    if "#" in section:
+        # Passage ids of size-bounded chunks end with "~<part>"
+        candidates.append(section.rsplit("#", 1)[-1].split("~", 1)[0])
+
+    for candidate in candidates:
+        for heading in outline:
+            if heading["id"] == candidate or heading["title"].lower() == candidate.lower():
+                return heading
+
+    if "top" in candidates[1:] or candidates[0] == "top":
+        # Text before the first heading
+        return {"id": "top", "start": 0, "end": outline[0]["start"] if outline else size}
+    return None
+
+
+def format_results(current: IndexState, results: list[dict], query: str) -> list[dict]:
+    """
+    Convert ranked documents or passages into filename/snippet tool results.
+
+    With `search.query_snippets`, each snippet is the window of its passage
+    where the query terms are densest, aligned to sentence starts recorded at
+    ingest time; otherwise it is the start of the passage.
+    """
+    pattern = query_pattern(query) if query_snippets else None
+    formatted = []
+    for r in results:
+        store = current.store(r["repo"])
+        start = r.get("start", 0)
+        if pattern is not None:
+            # The index has no term positions: scan the passage itself, bounded
+            length = min(r.get("end", start + MAX_SCAN_BYTES) - start, MAX_SCAN_BYTES)
+            data = store.read_bytes(r["repo"], r["filename"], start, length) or b""
+            starts = store.sentences(r["repo"], r["filename"])
+            snippet = make_snippet(data, start, starts, pattern, snippet_size, snippet_highlight)
+        else:
+            # Passages start at their own offset; read at most 4 bytes per character
+            length = min(r.get("end", start + 4 * snippet_size) - start, 4 * snippet_size)
+            text = store.read(r["repo"], r["filename"], start, length) or ""
+            snippet = text[:snippet_size]
+
+        result = {
+            "repo": r["repo"],
+            "filename": r["filename"],
+            "snippet": snippet,
+        }
+        if "section" in r:
+            result["section"] = r["section"]
+            result["passage_id"] = r["id"]
+        formatted.append(result)
+    return formatted
+
+
+@mcp.tool
+@tool_metrics.timed("scrape")
+async def scrape(url: str) -> str:
+    """
+    Fetch page text via Jina Reader.
+
+    If scraped-page indexing is enabled, the page also becomes searchable with
+    `search_repo_index` under the repo "web".
+    """
+    text = await page_fetcher.afetch(url)
+    await offloaded(index_scraped_pages)([(url, text)])
+    return text
+
+
 @mcp.tool
-def scrape(url: str) -> str:
-    """Fetch page text via Jina Reader."""
-    return fetch_page(url)
+@tool_metrics.timed("scrape_many")
+async def scrape_many(urls: list[str]) -> list[dict]:
+    """
+    Fetch several pages via Jina Reader concurrently.
+
+    Args:
+        urls (list[str]): URLs to fetch.
+
+    Returns:
+        list[dict]: {"url", "content"} or {"url", "error"} per URL, in input order.
+    """
+    results = await page_fetcher.fetch_many(
+        urls, max_concurrency=scrape_config.get("max_concurrency", 8)
+    )
+    await offloaded(index_scraped_pages)(
+        [(r["url"], r["content"]) for r in results if "content" in r]
+    )
+    return results
 
 
 @mcp.tool
-def search_repo_index(query: str, top_k: int = 5):
+@tool_metrics.timed("search_repo_index")
+@offloaded
+def search_repo_index(query: str, top_k: int = 5, repos: list[str] | None = None):
     """
     Search the repository index for relevant information.
 
+    While the server is still ingesting, results only cover the repositories
+    indexed so far (see `server_status`).
+
     Args:
         query (str): Search query.
         top_k (int): Number of results to return.
+        repos (list[str] | None): Only search these repositories (names from
+            `server_status`). Searches all of them by default.
+
+    Returns:
+        list[dict]: Search results with repo, filename and snippet (plus
+            section and passage_id when passage indexing is enabled).
+    """
+    current = state
+    scope = search_scope(current, repos)
+    shards = scoped_shards(current, scope)
+    results = query_cache.get(shards, query, top_k, scope)
+    if results is None:
+        results = search_state(current, [query], top_k, scope)[0]
+        query_cache.put(shards, query, top_k, results, scope)
+
+    return format_results(current, results, query)
+
+
+@mcp.tool
+@tool_metrics.timed("search_repo_index_batch")
+@offloaded
+def search_repo_index_batch(
+    queries: list[str], top_k: int = 5, repos: list[str] | None = None
+):
+    """
+    Search the repository index for several queries in one call.
+
+    Args:
+        queries (list[str]): Search queries.
+        top_k (int): Number of results to return per query.
+        repos (list[str] | None): Only search these repositories.
 
     Returns:
-        list[dict]: Search results with filename and snippet.
+        list[list[dict]]: Search results with repo, filename and snippet, one
+            list per query.
     """
-    results = search_index(index, query, top_k=top_k)
+    current = state
+    scope = search_scope(current, repos)
+    shards = scoped_shards(current, scope)
+    batch_results = [query_cache.get(shards, query, top_k, scope) for query in queries]
+    misses = [i for i, results in enumerate(batch_results) if results is None]
+
+    # Score only the uncached queries, still in a single batch
+    if misses:
+        computed = search_state(current, [queries[i] for i in misses], top_k, scope)
+        for i, results in zip(misses, computed):
+            batch_results[i] = results
+            query_cache.put(shards, queries[i], top_k, results, scope)
 
     return [
-        {
-            "filename": r["filename"],
-            "snippet": r["content"][:snippet_size],
-        }
-        for r in results
+        format_results(current, results, query)
+        for query, results in zip(queries, batch_results)
     ]
 
 
 @mcp.tool
-def read_repo_file(filename: str, repo: str | None = None) -> str:
-    """Read a file from the indexed repository by filename (and optional repo)."""
-    if repo is not None:
-        content = doc_lookup.get((repo, filename))
-        if content is None:
-            raise ValueError(f"File not found: {repo}:{filename}")
-        return content
-
-    matches = [(r, f) for (r, f) in doc_lookup.keys() if f == filename]
-    if not matches:
-        raise ValueError(f"File not found: {filename}")
-    if len(matches) > 1:
-        repos = sorted({r for (r, _) in matches})
-        raise ValueError(f"Multiple repos match {filename}: {', '.join(repos)}")
+@tool_metrics.timed("search_code")
+@offloaded
+def search_code(
+    query: str,
+    language: str | None = None,
+    top_k: int = 5,
+    repos: list[str] | None = None,
+) -> list[dict]:
+    """
+    Search only the fenced code blocks of the indexed documentation.
+
+    Faster and more targeted than searching whole documents when looking for
+    an example: each result carries the code block itself.
+
+    Args:
+        query (str): Search query (identifiers, API names, what the code does).
+        language (str | None): Only search blocks of this language, e.g.
+            "python" or "bash" ("py", "sh" and similar aliases work; untagged
+            blocks are "text"). Searches all languages by default.
+        top_k (int): Number of results to return.
+        repos (list[str] | None): Only search these repositories.
+
+    Returns:
+        list[dict]: Code blocks with repo, filename, section, language, code,
+            start and end (UTF-8 byte offsets of the code in the file, for
+            `read_repo_file`) and whether the code was truncated.
+    """
+    if not code_blocks:
+        raise ValueError("Code block indexing is disabled (search.code_blocks)")
+
+    current = state
+    scope = search_scope(current, repos)
+    if language is not None:
+        language = normalize_language(language)
+        known = {lang for by_language in current.code_shards.values() for lang in by_language}
+        if language not in known:
+            raise ValueError(
+                f"No code blocks in language: {language}; "
+                f"languages: {', '.join(sorted(known)) or 'none'}"
+            )
+
+    # Code searches share the query cache; a tuple never clashes with repo names
+    cache_scope = (("code", language), *scope)
+    shards = scoped_code_shards(current, language, scope)
+    results = query_cache.get(shards, query, top_k, cache_scope)
+    if results is None:
+        results = search_code_state(current, query, top_k, language, scope)
+        query_cache.put(shards, query, top_k, results, cache_scope)
+
+    return format_code_results(current, results)
+
+
+@mcp.tool
+async def query_cache_stats() -> dict:
+    """
+    Report query cache counters.
+
+    Returns:
+        dict: size, max_size, stale, hits, misses and hit_rate.
+    """
+    return query_cache.stats()
+
+
+@mcp.tool
+async def server_status() -> dict:
+    """
+    Report ingestion progress and whether the full index is ready.
+
+    Returns:
+        dict: ready flag, ingestion stage, repository and document counts,
+            elapsed time, error (if any) and the repositories searchable now.
+    """
+    current = state
+    return {
+        "ready": current.ready,
+        **progress.as_dict(),
+        "searchable_repos": list(current.repos),
+    }
+
+
+@mcp.tool
+@offloaded
+def server_stats() -> dict:
+    """
+    Report in-process performance statistics.
+
+    Returns:
+        dict: per-stage timings of the last ingestion, per-tool latency
+            histograms, index size, document store, query cache and page cache
+            counters.
+    """
+    return collect_stats()
+
+
+@mcp.tool
+@tool_metrics.timed("read_repo_file")
+@offloaded
+def read_repo_file(
+    filename: str,
+    repo: str | None = None,
+    offset: int = 0,
+    length: int | None = None,
+    section: str | None = None,
+) -> str:
+    """
+    Read a file from the indexed repository by filename (and optional repo).
+
+    The filename may also be a unique trailing part of the path, such as a
+    basename. For large files, read only part of it: either a `section` (a
+    heading id from `get_outline`, a heading title, or a search result's
+    `passage_id`) including its subsections, or `length` bytes starting at
+    byte `offset`. Offsets are UTF-8 byte offsets as reported by `get_outline`.
+    """
+    if offset < 0 or (length is not None and length < 0):
+        raise ValueError("offset and length must not be negative")
+
+    current = state
+    repo_name, path = resolve_file(current, filename, repo)
+
+    if section is not None:
+        size, outline = document_outline(current, repo_name, path)
+        heading = find_section(outline, section, size)
+        if heading is None:
+            ids = ", ".join(h["id"] for h in outline[:50]) or "none"
+            raise ValueError(f"Section not found in {repo_name}:{path}: {section} (sections: {ids})")
+        section_length = heading["end"] - heading["start"] - offset
+        offset = heading["start"] + offset
+        length = section_length if length is None else min(length, section_length)
+
+    if offset == 0 and length is None:
+        content = current.store(repo_name).get(repo_name, path)
+    else:
+        content = current.store(repo_name).read(repo_name, path, offset, length)
+    if content is None:
+        raise ValueError(f"File not found: {repo_name}:{path}")
+    return content
+
+
+@mcp.tool
+@tool_metrics.timed("get_outline")
+@offloaded
+def get_outline(filename: str, repo: str | None = None) -> dict:
+    """
+    Return the heading outline of a file with byte offsets.
+
+    Use it to read only the relevant part of a large file with
+    `read_repo_file(..., section=...)` or `offset`/`length`.
+
+    Args:
+        filename (str): Path, unique path suffix or basename.
+        repo (str | None): Repository name, if the filename is ambiguous.
+
+    Returns:
+        dict: repo, filename, size (bytes) and sections, each with level, title,
+            id, start and end (UTF-8 byte offsets; a section includes its
+            subsections).
+    """
+    current = state
+    repo_name, path = resolve_file(current, filename, repo)
+    size, outline = document_outline(current, repo_name, path)
+    return {"repo": repo_name, "filename": path, "size": size, "sections": outline}
+
+
+@mcp.tool
+@tool_metrics.timed("find_repo_files")
+@offloaded
+def find_repo_files(pattern: str, limit: int = 50) -> list[dict]:
+    """
+    Find indexed files by path prefix or glob pattern.
+
+    Args:
+        pattern (str): Path prefix ("docs/servers/") or glob ("*.mdx", "docs/*/auth*").
+        limit (int): Maximum number of results.
+
+    Returns:
+        list[dict]: Matching files with repo and filename.
+    """
+    return [
+        {"repo": repo, "filename": filename}
+        for repo, filename in state.file_index.find(pattern, limit=limit)
+    ]
+
+# ---------------------------------------------------------------------
+# HTTP worker processes
+# ---------------------------------------------------------------------
+
+def load_published_state() -> bool:
+    """
+    Publish the full index snapshot saved by the ingesting process.
+
+    HTTP worker processes never download or ingest; they serve the last saved
+    snapshot, whatever inputs it was built for. With `search.compact` its
+    shards map the postings files in `shards_dir` read-only, so all workers on
+    the host share one copy of the index through the page cache.
+
+    Returns:
+        bool: True if a snapshot was found and published.
+    """
+    index_snapshot = load_snapshot(str(Path(snapshots_dir) / "index.pkl"), None)
+    if index_snapshot is None:
+        return False
+
+    repo_names = tuple(name for name in index_snapshot["shards"] if name != WEB_REPO)
+    new_state = state_from_snapshot(index_snapshot, repo_names)
+    with state_lock:
+        publish(sync_web_pages(new_state))
+    progress.update(
+        stage="ready",
+        repos_total=len(repo_names),
+        repos_indexed=len(repo_names),
+        documents=len(new_state.documents),
+    )
+    return True
+
+
+def follow_published_state(interval: float) -> None:
+    """
+    Poll the full index snapshot and publish it again when it is replaced.
+
+    Args:
+        interval (float): Seconds between checks.
+    """
+    snapshot_path = Path(snapshots_dir) / "index.pkl"
+    published_mtime = snapshot_path.stat().st_mtime_ns
+
+    while True:
+        time.sleep(interval)
+        try:
+            mtime = snapshot_path.stat().st_mtime_ns
+            if mtime != published_mtime and load_published_state():
+                published_mtime = mtime
+                log("Reloaded index snapshot")
+        except Exception:
+            log(traceback.format_exc())
+
+
+def start_follower(interval: float) -> threading.Thread:
+    """Start following the index snapshot in a daemon thread."""
+    thread = threading.Thread(
+        target=follow_published_state,
+        args=(interval,),
+        name="follow",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def create_worker_app():
+    """
+    Build the ASGI app of one HTTP worker process (a uvicorn app factory).
+
+    The app serves the MCP tools over stateless streamable HTTP, so any worker
+    can answer any request of any session.
+
+    Raises:
+        RuntimeError: If no index snapshot has been saved yet.
+    """
+    if not load_published_state():
+        raise RuntimeError(f"No index snapshot in {snapshots_dir}; build the index first")
+    if watch_config.get("enabled", False):
+        start_follower(watch_config.get("interval", 10))
+    if stats_config.get("log_interval", 0) > 0:
+        start_stats_logger(stats_config["log_interval"])
+    return mcp.http_app(stateless_http=True)
+
 
-    repo_name = matches[0][0]
-    return doc_lookup[(repo_name, filename)]
+def serve_http_workers(workers: int) -> None:
+    """
+    Build the index once, then serve it from a pool of HTTP worker processes.
+
+    The index is built (or loaded from its snapshot) in this process before any
+    worker starts. With watching enabled this process keeps reloading the index
+    and saving new snapshots, which the workers pick up.
+
+    Args:
+        workers (int): Number of worker processes.
+    """
+    if not compact_shards:
+        log("search.compact is off: every HTTP worker loads its own copy of the index")
+
+    run_build_index()
+    if not state.ready:
+        raise SystemExit(f"Index build failed: {progress.as_dict()['error']}")
+    if watch_config.get("enabled", False):
+        start_watcher(watch_config.get("interval", 10))
+
+    log(f"Serving {len(state.shards)} shards with {workers} HTTP workers...")
+    uvicorn.run(
+        "main:create_worker_app",
+        factory=True,
+        host=server_config.get("host", "127.0.0.1"),
+        port=server_config.get("port", 8000),
+        workers=workers,
+        # Importing the server and mapping the snapshot takes a few seconds
+        timeout_worker_healthcheck=60,
+    )
 
 # ---------------------------------------------------------------------
 # Run MCP server
 # ---------------------------------------------------------------------
 
-print("\nMCP server is ready. Waiting for tool calls...")
 def main()->None:
-    mcp.run()
-    
+    log("Starting MCP server...")
+    Path(zips_dir).mkdir(parents=True, exist_ok=True)
+
+    transport = server_config.get("transport", "stdio")
+    workers = server_config.get("workers", 1)
+    if transport == "http" and workers > 1:
+        serve_http_workers(workers)
+        return
+
+    # Accept connections right away; the index is built in the background
+    start_background_ingest()
+    if watch_config.get("enabled", False):
+        start_watcher(watch_config.get("interval", 10))
+    if stats_config.get("log_interval", 0) > 0:
+        start_stats_logger(stats_config["log_interval"])
+
+    if transport == "http":
+        mcp.run(
+            transport="http",
+            host=server_config.get("host", "127.0.0.1"),
+            port=server_config.get("port", 8000),
+        )
+    else:
+        mcp.run()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,156 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+# Upper bounds (ms) of the latency buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (
+    0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000, 30_000,
+)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram.
+
+    Recording is O(log buckets) and memory is constant, so it can stay enabled
+    on every call. Percentiles are estimated as the upper bound of the bucket
+    that contains them.
+
+    Attributes:
+        counts (list[int]): Calls per bucket, plus one overflow bucket.
+        count (int): Number of recorded calls.
+        total_ms (float): Sum of the recorded latencies.
+        max_ms (float): Slowest recorded call.
+        errors (int): Number of calls that raised.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+
+    def record(self, ms: float, error: bool = False) -> None:
+        """Record one call."""
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if error:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a latency percentile.
+
+        Args:
+            q (float): Percentile between 0 and 100.
+
+        Returns:
+            float: Upper bound (ms) of the bucket holding the percentile, or the
+                maximum for the overflow bucket; 0.0 if nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self) -> dict:
+        """Return the histogram as a plain dictionary."""
+        buckets = {f"le_{bound:g}ms": count for bound, count in zip(LATENCY_BUCKETS_MS, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class ToolMetrics:
+    """
+    Thread-safe per-tool latency histograms.
+
+    Example:
+        >>> metrics = ToolMetrics()
+        >>> @metrics.timed("search_repo_index")
+        ... def search(query): ...
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+
+    def record(self, name: str, ms: float, error: bool = False) -> None:
+        """Record one call of a tool."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(ms, error=error)
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """
+        Decorate a function so each call is recorded under `name`.
+
+        The wrapper keeps the signature of the wrapped function (and whether it
+        is a coroutine function), so it can be registered as an MCP tool.
+
+        Args:
+            name (str): Histogram name, usually the tool name.
+
+        Returns:
+            Callable[[Callable], Callable]: The decorator.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    start = time.perf_counter()
+                    error = False
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception:
+                        error = True
+                        raise
+                    finally:
+                        self.record(name, (time.perf_counter() - start) * 1000, error=error)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                error = False
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    self.record(name, (time.perf_counter() - start) * 1000, error=error)
+
+            return wrapper
+
+        return decorator
+
+    def as_dict(self) -> dict:
+        """Return every histogram as a plain dictionary."""
+        with self._lock:
+            return {name: histogram.as_dict() for name, histogram in sorted(self._histograms.items())}
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+def _sha256(data: bytes) -> str:
+    """Return the hex SHA-256 digest of some bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write a file through a temporary name so readers never see partial data."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class PageCache:
+    """
+    Content-addressed on-disk cache of fetched pages.
+
+    Page bodies are stored once per distinct content under `blobs/<sha256>`;
+    `pages/<sha256 of url>.json` maps a URL to its blob and fetch time. Entries
+    older than `ttl` seconds are ignored and removed. When the blobs exceed
+    `max_bytes`, the least recently read URLs are evicted (a hit refreshes the
+    entry's mtime) and blobs no longer referenced are deleted.
+
+    Attributes:
+        directory (Path): Cache root.
+        ttl (float): Seconds an entry stays fresh.
+        max_bytes (int): Size budget for stored page bodies.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that were missing or expired.
+    """
+
+    def __init__(self, directory: str, ttl: float = 86_400, max_bytes: int = 100 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._pages = self.directory / "pages"
+        self._blobs = self.directory / "blobs"
+        self._pages.mkdir(parents=True, exist_ok=True)
+        self._blobs.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = sum(path.stat().st_size for path in self._blobs.iterdir())
+        if self._bytes > self.max_bytes:
+            self._evict()  # the budget may have been lowered since the last run
+
+    def _page_path(self, url: str) -> Path:
+        """Return the path of the entry of a URL."""
+        return self._pages / f"{_sha256(url.encode('utf-8'))}.json"
+
+    def _read_page(self, path: Path) -> dict | None:
+        """Read a URL entry, returning None if missing or invalid."""
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def get(self, url: str) -> str | None:
+        """
+        Return the cached body of a URL if it is still fresh.
+
+        Args:
+            url (str): Fetched URL.
+
+        Returns:
+            str | None: Cached text, or None if missing or expired.
+        """
+        page_path = self._page_path(url)
+        with self._lock:
+            page = self._read_page(page_path)
+            if page is None or page.get("url") != url:
+                self.misses += 1
+                return None
+
+            if time.time() - page["fetched_at"] > self.ttl:
+                self._drop_pages([page_path])
+                self.misses += 1
+                return None
+
+            try:
+                text = (self._blobs / page["sha256"]).read_text(encoding="utf-8")
+                os.utime(page_path)  # mark as recently used
+            except OSError:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return text
+
+    def put(self, url: str, text: str) -> None:
+        """
+        Store the body of a URL, then evict entries beyond `max_bytes`.
+
+        Args:
+            url (str): Fetched URL.
+            text (str): Page text.
+        """
+        data = text.encode("utf-8")
+        digest = _sha256(data)
+        blob_path = self._blobs / digest
+        page = {"url": url, "sha256": digest, "fetched_at": time.time(), "size": len(data)}
+
+        with self._lock:
+            if not blob_path.exists():
+                _write_atomic(blob_path, data)
+                self._bytes += len(data)
+            _write_atomic(self._page_path(url), json.dumps(page).encode("utf-8"))
+
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _drop_pages(self, page_paths: list[Path]) -> None:
+        """Remove URL entries and delete the blobs no other entry references."""
+        for path in page_paths:
+            path.unlink(missing_ok=True)
+
+        referenced = set()
+        for path in self._pages.glob("*.json"):
+            page = self._read_page(path)
+            if page is not None:
+                referenced.add(page["sha256"])
+
+        for blob_path in self._blobs.iterdir():
+            if blob_path.name not in referenced and not blob_path.name.endswith(".tmp"):
+                self._bytes -= blob_path.stat().st_size
+                blob_path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones, until within budget."""
+        now = time.time()
+        pages = []
+        for path in self._pages.glob("*.json"):
+            page = self._read_page(path)
+            if page is None:
+                continue
+            pages.append((now - page["fetched_at"] > self.ttl, path.stat().st_mtime, path, page))
+
+        # Expired entries first, then oldest access first
+        pages.sort(key=lambda item: (not item[0], item[1]))
+        sizes = {page["sha256"]: page["size"] for *_, page in pages}
+        references: dict[str, int] = {}
+        for *_, page in pages:
+            references[page["sha256"]] = references.get(page["sha256"], 0) + 1
+
+        to_drop = []
+        remaining = self._bytes
+        for expired, _, path, page in pages:
+            if not expired and remaining <= self.max_bytes:
+                break
+            to_drop.append(path)
+            references[page["sha256"]] -= 1
+            if references[page["sha256"]] == 0:
+                remaining -= sizes[page["sha256"]]
+
+        if to_drop:
+            self._drop_pages(to_drop)
+
+    def stats(self) -> dict:
+        """
+        Return cache counters.
+
+        Returns:
+            dict: entries, bytes, max_bytes, hits, misses and hit_rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": sum(1 for _ in self._pages.glob("*.json")),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,317 @@
+import bisect
+import re
+from collections.abc import Iterable, Iterator
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+FENCE_PATTERN = re.compile(r"^[ \t]{0,3}(```|~~~)")
+INFO_PATTERN = re.compile(r"[\w+#.-]+")
+
+# Common spellings of the same language, so a filter finds all its blocks
+LANGUAGE_ALIASES = {
+    "": "text",
+    "py": "python",
+    "python3": "python",
+    "js": "javascript",
+    "ts": "typescript",
+    "sh": "bash",
+    "shell": "bash",
+    "console": "bash",
+    "zsh": "bash",
+    "yml": "yaml",
+    "md": "markdown",
+}
+
+
+def slugify(heading: str) -> str:
+    """
+    Turn a heading into a GitHub-style anchor slug.
+
+    Args:
+        heading (str): Heading text.
+
+    Returns:
+        str: Lowercase slug with spaces replaced by dashes.
+    """
+    slug = re.sub(r"[^\w\- ]", "", heading.strip().lower())
+    return slug.replace(" ", "-")
+
+
+def iter_sections(content: str) -> Iterator[tuple[int, str, int, int]]:
+    """
+    Split Markdown into heading-delimited sections with UTF-8 byte offsets.
+
+    Headings inside fenced code blocks are ignored. Text before the first heading
+    forms a level-0 section with an empty title.
+
+    Args:
+        content (str): Markdown text.
+
+    Yields:
+        tuple[int, str, int, int]: (level, title, start byte, end byte).
+    """
+    level, title, start = 0, "", 0
+    offset = 0
+    fence: str | None = None
+
+    for line in content.splitlines(keepends=True):
+        fence_match = FENCE_PATTERN.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker == fence:
+                fence = None
+        elif fence is None:
+            heading_match = HEADING_PATTERN.match(line.rstrip("\r\n"))
+            if heading_match:
+                if offset > start:
+                    yield level, title, start, offset
+                level = len(heading_match.group(1))
+                title = heading_match.group(2)
+                start = offset
+
+        offset += len(line.encode("utf-8"))
+
+    if offset > start:
+        yield level, title, start, offset
+
+
+def split_bytes(encoded: bytes, start: int, end: int, max_bytes: int) -> list[tuple[int, int]]:
+    """
+    Split a byte range into chunks of at most `max_bytes`, preferring line breaks.
+
+    Chunk boundaries never fall inside a UTF-8 character.
+
+    Args:
+        encoded (bytes): UTF-8 encoded document.
+        start (int): Start offset of the range.
+        end (int): End offset of the range.
+        max_bytes (int): Maximum chunk size.
+
+    Returns:
+        list[tuple[int, int]]: (start, end) offsets of the chunks.
+    """
+    chunks = []
+    while end - start > max_bytes:
+        cut = encoded.rfind(b"\n", start, start + max_bytes) + 1
+        if cut <= start:
+            # One long line: cut before a UTF-8 continuation byte is never taken
+            cut = start + max_bytes
+            while cut > start and encoded[cut] & 0xC0 == 0x80:
+                cut -= 1
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, end))
+    return chunks
+
+
+def iter_slugged_sections(content: str) -> Iterator[tuple[int, str, str, int, int]]:
+    """
+    Yield the sections of `iter_sections` with a unique anchor slug each.
+
+    Repeated slugs get a numeric suffix ("usage", "usage-1", ...) and the text
+    before the first heading is "top", so slugs match passage ids.
+
+    Args:
+        content (str): Markdown text.
+
+    Yields:
+        tuple[int, str, str, int, int]: (level, title, slug, start byte, end byte).
+    """
+    seen: dict[str, int] = {}
+    for level, title, start, end in iter_sections(content):
+        slug = slugify(title) or "top"
+        count = seen.get(slug, 0)
+        seen[slug] = count + 1
+        if count:
+            slug = f"{slug}-{count}"
+        yield level, title, slug, start, end
+
+
+def build_outline(content: str) -> list[dict]:
+    """
+    Build the heading outline of a document.
+
+    A heading's range covers its subsections, i.e. it ends where the next heading
+    of the same or a higher level starts.
+
+    Args:
+        content (str): Markdown text.
+
+    Returns:
+        list[dict]: Headings in document order with 'level', 'title', 'id'
+            (anchor slug), 'start' and 'end' (UTF-8 byte offsets).
+    """
+    sections = [
+        {"level": level, "title": title, "id": slug, "start": start, "end": end}
+        for level, title, slug, start, end in iter_slugged_sections(content)
+        if level > 0
+    ]
+
+    # Walk backwards so each heading knows where its enclosing range ends
+    open_ends: list[tuple[int, int]] = []  # (level, start) of following headings
+    document_end = len(content.encode("utf-8"))
+    for section in reversed(sections):
+        while open_ends and open_ends[-1][0] > section["level"]:
+            open_ends.pop()
+        section["end"] = open_ends[-1][1] if open_ends else document_end
+        open_ends.append((section["level"], section["start"]))
+
+    return sections
+
+
+def split_passages(doc: dict[str, str], max_bytes: int | None = None) -> list[dict]:
+    """
+    Split a document into heading-delimited passages.
+
+    Passage ids are `<filename>#<slug>` (with a numeric suffix for repeated
+    headings), so they stay stable when unrelated sections change. With
+    `max_bytes`, longer sections are further split at line breaks into parts
+    with ids `<filename>#<slug>~<n>` for n >= 2.
+
+    Args:
+        doc (dict[str, str]): Document with 'filename', 'content' and optional 'repo'.
+        max_bytes (int | None): Maximum passage size in UTF-8 bytes.
+
+    Returns:
+        list[dict]: Passages with 'id', 'repo', 'filename', 'section', 'start',
+            'end' (UTF-8 byte offsets into the document) and 'content'.
+    """
+    content = doc["content"]
+    encoded = content.encode("utf-8")
+    passages: list[dict] = []
+
+    for _, title, slug, start, end in iter_slugged_sections(content):
+        chunks = split_bytes(encoded, start, end, max_bytes) if max_bytes else [(start, end)]
+        for part, (chunk_start, chunk_end) in enumerate(chunks, start=1):
+            text = encoded[chunk_start:chunk_end].decode("utf-8")
+            if not text.strip():
+                continue
+
+            passages.append(
+                {
+                    "id": f"{doc['filename']}#{slug}" + (f"~{part}" if part > 1 else ""),
+                    "repo": doc.get("repo"),
+                    "filename": doc["filename"],
+                    "section": title,
+                    "start": chunk_start,
+                    "end": chunk_end,
+                    "content": text,
+                }
+            )
+
+    return passages
+
+
+def normalize_language(language: str) -> str:
+    """
+    Normalize a code block language tag.
+
+    Args:
+        language (str): Tag such as "Python", "py" or "{.python}"; may be empty.
+
+    Returns:
+        str: Lowercase canonical name ("python"), "text" for untagged blocks.
+    """
+    match = INFO_PATTERN.search(language.lower())
+    name = match.group().lstrip(".") if match else ""
+    return LANGUAGE_ALIASES.get(name, name)
+
+
+def iter_code_blocks(content: str) -> Iterator[tuple[str, str, str, int, int]]:
+    """
+    Find the fenced code blocks of a Markdown document.
+
+    Fences are matched like in `iter_sections`; a block left open runs to the
+    end of the document.
+
+    Args:
+        content (str): Markdown text.
+
+    Yields:
+        tuple[str, str, str, int, int]: (language, section title, section slug,
+            start byte, end byte), where the byte range covers the code between
+            the fences.
+    """
+    sections = list(iter_slugged_sections(content))
+    section_starts = [start for *_, start, _ in sections]
+    fence: str | None = None
+    language, start = "", 0
+    offset = 0
+
+    def block(end: int) -> tuple[str, str, str, int, int]:
+        _, title, slug, _, _ = sections[bisect.bisect_right(section_starts, start) - 1]
+        return normalize_language(language), title, slug, start, end
+
+    for line in content.splitlines(keepends=True):
+        line_end = offset + len(line.encode("utf-8"))
+        fence_match = FENCE_PATTERN.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence, language, start = marker, line[fence_match.end():].strip(), line_end
+            elif marker == fence:
+                fence = None
+                if offset > start:
+                    yield block(offset)
+        offset = line_end
+
+    if fence is not None and offset > start:
+        yield block(offset)
+
+
+def split_code_blocks(documents: Iterable[dict[str, str]]) -> list[dict]:
+    """
+    Extract the fenced code blocks of every document, preserving document order.
+
+    Block ids are `<filename>#<slug>/code-<n>`, numbering the blocks of each
+    section from 1.
+
+    Args:
+        documents (Iterable[dict[str, str]]): Documents with 'filename',
+            'content' and optional 'repo'.
+
+    Returns:
+        list[dict]: Blocks with 'id', 'repo', 'filename', 'section', 'language',
+            'start', 'end' (UTF-8 byte offsets of the code into the document)
+            and 'content' (the section title followed by the code, which is
+            what gets indexed).
+    """
+    blocks = []
+    for doc in documents:
+        encoded = doc["content"].encode("utf-8")
+        counts: dict[str, int] = {}
+        for language, title, slug, start, end in iter_code_blocks(doc["content"]):
+            code = encoded[start:end].decode("utf-8")
+            if not code.strip():
+                continue
+            counts[slug] = counts.get(slug, 0) + 1
+            blocks.append(
+                {
+                    "id": f"{doc['filename']}#{slug}/code-{counts[slug]}",
+                    "repo": doc.get("repo"),
+                    "filename": doc["filename"],
+                    "section": title,
+                    "language": language,
+                    "start": start,
+                    "end": end,
+                    "content": f"{title}\n{code}",
+                }
+            )
+    return blocks
+
+
+def split_documents(
+    documents: Iterable[dict[str, str]], max_bytes: int | None = None
+) -> list[dict]:
+    """
+    Split every document into passages, preserving document order.
+
+    Args:
+        documents (Iterable[dict[str, str]]): Documents to split.
+        max_bytes (int | None): Maximum passage size in UTF-8 bytes.
+
+    Returns:
+        list[dict]: Passages of all documents.
+    """
+    return [passage for doc in documents for passage in split_passages(doc, max_bytes)]
@@ -0,0 +1,582 @@
+import json
+import mmap
+import os
+from collections import Counter
+from collections.abc import Sequence
+
+import numpy as np
+from scipy import sparse
+
+from bm25 import BM25Index, maxscore_top_k, row_maxima, tokenize
+
+MAGIC = b"MCPIDX1\n"
+# Sections start on a cache-line boundary so every array view is aligned
+ALIGNMENT = 64
+# Postings per skip block; a lookup decodes only the blocks that may hold its ids
+BLOCK_SIZE = 128
+
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """
+    Encode non-negative integers as LEB128 varints (7 bits per byte).
+
+    Args:
+        values (np.ndarray): Non-negative integers.
+
+    Returns:
+        np.ndarray: uint8 buffer; small values take one byte.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        n_bytes += values >= (np.uint64(1) << np.uint64(shift))
+
+    ends = np.cumsum(n_bytes)
+    starts = ends - n_bytes
+    out = np.zeros(int(ends[-1]) if len(values) else 0, dtype=np.uint8)
+
+    # One vectorized pass per byte position
+    for position in range(int(n_bytes.max()) if len(values) else 0):
+        has_byte = n_bytes > position
+        chunk = (values[has_byte] >> np.uint64(7 * position)) & np.uint64(0x7F)
+        more = (n_bytes[has_byte] > position + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has_byte] + position] = (chunk | more).astype(np.uint8)
+    return out
+
+
+def decode_varints(buffer: np.ndarray) -> np.ndarray:
+    """
+    Decode a buffer of LEB128 varints.
+
+    Args:
+        buffer (np.ndarray): uint8 buffer produced by `encode_varints`.
+
+    Returns:
+        np.ndarray: The decoded integers as int64.
+    """
+    if len(buffer) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    ends = np.flatnonzero(buffer < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    positions = np.arange(len(buffer)) - np.repeat(starts, ends - starts + 1)
+    parts = (buffer & 0x7F).astype(np.int64) << (7 * positions)
+    return np.add.reduceat(parts, starts)
+
+
+def _encode_rows(matrix: sparse.csr_matrix) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Delta- and varint-encode the column ids of every row of a CSR matrix.
+
+    Args:
+        matrix (sparse.csr_matrix): Matrix with sorted indices.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The uint8 buffer and the byte offset of
+            each value (len = nnz + 1); index it with `indptr` for row offsets.
+    """
+    indices = matrix.indices.astype(np.int64)
+    gaps = np.diff(indices, prepend=0)
+    row_starts = matrix.indptr[:-1][np.diff(matrix.indptr) > 0]
+    gaps[row_starts] = indices[row_starts]  # each row restarts from zero
+
+    encoded = encode_varints(gaps)
+    # Value k starts right after the terminating byte of value k - 1
+    value_starts = np.concatenate([[0], np.flatnonzero(encoded < 0x80) + 1]).astype(np.int64)
+    return encoded, value_starts
+
+
+def _skip_blocks(
+    matrix: sparse.csr_matrix, value_starts: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cut every row into blocks of `BLOCK_SIZE` postings.
+
+    Args:
+        matrix (sparse.csr_matrix): Matrix with sorted indices.
+        value_starts (np.ndarray): Byte offset of each value, from `_encode_rows`.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: First block of each row
+            (len = rows + 1), last column id of each block, and byte offset of
+            each block (len = blocks + 1).
+    """
+    lengths = np.diff(matrix.indptr)
+    n_blocks = -(-lengths // BLOCK_SIZE)
+    row_blocks = np.concatenate([[0], np.cumsum(n_blocks)]).astype(np.int64)
+
+    # Position of each block within its row, then its first and last value
+    rank = np.arange(row_blocks[-1]) - np.repeat(row_blocks[:-1], n_blocks)
+    first = np.repeat(matrix.indptr[:-1], n_blocks) + rank * BLOCK_SIZE
+    last = np.minimum(first + BLOCK_SIZE, np.repeat(matrix.indptr[1:], n_blocks)) - 1
+
+    block_last = matrix.indices[last].astype(np.int64)
+    block_offsets = np.concatenate([value_starts[first], value_starts[-1:]]).astype(np.int64)
+    return row_blocks, block_last, block_offsets
+
+
+def _gather_ranges(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate buffer[starts[i]:ends[i]] for all i without a Python loop."""
+    lengths = ends - starts
+    shift = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return buffer[np.arange(int(lengths.sum())) + shift]
+
+
+def _decode_rows(
+    encoded: np.ndarray, byte_offsets: np.ndarray, indptr: np.ndarray
+) -> np.ndarray:
+    """Decode all delta-encoded rows back into column ids."""
+    gaps = decode_varints(encoded[: byte_offsets[-1]])
+    sums = np.cumsum(gaps)
+    lengths = np.diff(indptr)
+    nonempty = lengths > 0
+    # Subtract the running sum reached before each row started
+    before = np.zeros(len(lengths), dtype=np.int64)
+    before[nonempty] = sums[indptr[:-1][nonempty]] - gaps[indptr[:-1][nonempty]]
+    return sums - np.repeat(before, lengths)
+
+
+class _DocTable(Sequence):
+    """Read-only list of documents stored as JSON records, decoded on access."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return json.loads(self._blob[self._offsets[i] : self._offsets[i + 1]].tobytes())
+
+
+class CompactIndex:
+    """
+    Read-only BM25 index with integer-encoded postings in flat buffers.
+
+    Holds the same scores as a fitted `BM25Index` without per-term or
+    per-document Python objects:
+
+    - the vocabulary is interned into integer ids in sorted order, stored as one
+      UTF-8 blob plus offsets and looked up by binary search;
+    - each term's postings are delta-encoded document ids packed as varints,
+      with the BM25 weights in a parallel float32 array, the largest weight of
+      each term (for MaxScore pruning) and a skip list of 128-posting blocks;
+    - the raw per-field term counts (varints) and document lengths are kept so
+      the index can be turned back into a `BM25Index` for updates;
+    - document metadata (everything but "content") is stored as JSON records
+      and decoded on access.
+
+    Every buffer is a NumPy view, either on in-memory arrays or on a read-only
+    memory map of the file written by `save`. Processes mapping the same file
+    share its pages. Pickling a loaded index stores only its path.
+
+    Attributes:
+        text_fields (list[str]): Indexed text fields.
+        field_weights (dict[str, float]): Weight of each field.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalization.
+        path (str | None): File the buffers are mapped from, if any.
+        docs (Sequence[dict]): Indexed documents, decoded on access.
+    """
+
+    def __init__(self, meta: dict, arrays: dict[str, np.ndarray], path: str | None = None):
+        self.text_fields = meta["text_fields"]
+        self.field_weights = meta["field_weights"]
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.path = path
+        self._meta = meta
+        self._arrays = arrays
+        self.docs = _DocTable(arrays["docs"], arrays["doc_offsets"])
+
+    @classmethod
+    def from_bm25(cls, index: BM25Index) -> "CompactIndex":
+        """
+        Encode a fitted `BM25Index`.
+
+        Args:
+            index (BM25Index): The index to encode.
+
+        Returns:
+            CompactIndex: In-memory compact copy of the index.
+        """
+        # Renumber terms in sorted order so a term id is its rank
+        terms = sorted(index.vocabulary)
+        order = np.asarray([index.vocabulary[term] for term in terms], dtype=np.int64)
+        encoded_terms = [term.encode("utf-8") for term in terms]
+
+        arrays: dict[str, np.ndarray] = {
+            "terms": np.frombuffer(b"".join(encoded_terms), dtype=np.uint8),
+            "term_offsets": np.concatenate(
+                [[0], np.cumsum([len(term) for term in encoded_terms], dtype=np.int64)]
+            ).astype(np.int64),
+        }
+
+        weights = index.term_doc_matrix[order].sorted_indices()
+        arrays["postings"], value_starts = _encode_rows(weights)
+        arrays["posting_offsets"] = value_starts[weights.indptr]
+        arrays["indptr"] = weights.indptr.astype(np.int64)
+        arrays["weights"] = weights.data.astype(np.float32)
+        arrays["max_weights"] = row_maxima(weights)
+        arrays["term_blocks"], arrays["block_last"], arrays["block_offsets"] = _skip_blocks(
+            weights, value_starts
+        )
+
+        for field in index.text_fields:
+            counts = index.term_counts[field][order].sorted_indices()
+            arrays[f"{field}.postings"], value_starts = _encode_rows(counts)
+            arrays[f"{field}.posting_offsets"] = value_starts[counts.indptr]
+            arrays[f"{field}.indptr"] = counts.indptr.astype(np.int64)
+            arrays[f"{field}.counts"] = encode_varints(counts.data.astype(np.int64))
+            arrays[f"{field}.lengths"] = index.doc_lengths[field].astype(np.float32)
+
+        # Document text is served from the document store, not the index
+        records = [
+            json.dumps(
+                {key: value for key, value in doc.items() if key != "content"},
+                separators=(",", ":"),
+            ).encode("utf-8")
+            for doc in index.docs
+        ]
+        arrays["docs"] = np.frombuffer(b"".join(records), dtype=np.uint8)
+        arrays["doc_offsets"] = np.concatenate(
+            [[0], np.cumsum([len(record) for record in records], dtype=np.int64)]
+        ).astype(np.int64)
+
+        meta = {
+            "text_fields": list(index.text_fields),
+            "field_weights": dict(index.field_weights),
+            "k1": index.k1,
+            "b": index.b,
+            "n_terms": len(terms),
+            "n_docs": len(index.docs),
+        }
+        return cls(meta, arrays)
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to one file, atomically.
+
+        Layout: the magic bytes, the header length (8 bytes, little endian), a
+        JSON header with the metadata and the dtype, offset and length of each
+        section, then the sections, each aligned to 64 bytes.
+
+        Args:
+            path (str): Destination file.
+        """
+        sections = {}
+        offset = 0
+        for name, array in self._arrays.items():
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            sections[name] = {"dtype": array.dtype.str, "offset": offset, "count": len(array)}
+            offset += array.nbytes
+
+        header = json.dumps({"meta": self._meta, "sections": sections}).encode("utf-8")
+        data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for name, array in self._arrays.items():
+                f.seek(data_start + sections[name]["offset"])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(tmp_path, path)  # readers never see a half-written file
+        self.path = path
+
+    @classmethod
+    def load(cls, path: str) -> "CompactIndex":
+        """
+        Map an index file read-only.
+
+        Args:
+            path (str): File written by `save`.
+
+        Returns:
+            CompactIndex: Index whose buffers are views on the memory map.
+
+        Raises:
+            ValueError: If the file is not a compact index.
+        """
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if mapped[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a compact index file: {path}")
+        header_length = int.from_bytes(mapped[len(MAGIC) : len(MAGIC) + 8], "little")
+        header_end = len(MAGIC) + 8 + header_length
+        header = json.loads(mapped[len(MAGIC) + 8 : header_end])
+        data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+
+        arrays = {
+            name: np.frombuffer(
+                mapped,
+                dtype=np.dtype(section["dtype"]),
+                count=section["count"],
+                offset=data_start + section["offset"],
+            )
+            for name, section in header["sections"].items()
+        }
+        return cls(header["meta"], arrays, path=path)
+
+    def __getstate__(self) -> dict:
+        # A mapped index is re-mapped from its file instead of being copied
+        if self.path is not None:
+            return {"path": self.path}
+        return {"meta": self._meta, "arrays": self._arrays}
+
+    def __setstate__(self, state: dict) -> None:
+        if "path" in state:
+            loaded = CompactIndex.load(state["path"])
+            state = {"meta": loaded._meta, "arrays": loaded._arrays, "path": loaded.path}
+        self.__init__(state["meta"], state["arrays"], path=state.get("path"))
+
+    @property
+    def n_terms(self) -> int:
+        """Number of distinct terms."""
+        return self._meta["n_terms"]
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the buffers."""
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def term_id(self, term: str) -> int | None:
+        """
+        Look up the id of a term by binary search over the sorted vocabulary.
+
+        Args:
+            term (str): Term to look up.
+
+        Returns:
+            int | None: The term id, or None if the term is not indexed.
+        """
+        target = term.encode("utf-8")
+        terms, offsets = self._arrays["terms"], self._arrays["term_offsets"]
+        low, high = 0, self._meta["n_terms"]
+        while low < high:
+            middle = (low + high) // 2
+            candidate = terms[offsets[middle] : offsets[middle + 1]].tobytes()
+            if candidate < target:
+                low = middle + 1
+            elif candidate > target:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def postings(self, term_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Decode the postings of one term.
+
+        Args:
+            term_id (int): Term id from `term_id`.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Document ids and their BM25 weights.
+        """
+        arrays = self._arrays
+        start, end = arrays["posting_offsets"][term_id], arrays["posting_offsets"][term_id + 1]
+        doc_ids = np.cumsum(decode_varints(arrays["postings"][start:end]))
+        first, last = arrays["indptr"][term_id], arrays["indptr"][term_id + 1]
+        return doc_ids, arrays["weights"][first:last]
+
+    def term_bound(self, term_id: int) -> float:
+        """Return the largest weight of a term."""
+        return self._arrays["max_weights"][term_id]
+
+    def lookup(self, term_id: int, doc_ids: np.ndarray) -> np.ndarray:
+        """
+        Return the weights of a term for some documents.
+
+        Only the skip blocks whose id range may contain one of `doc_ids` are
+        decoded, so looking up a few candidates in a long posting list is cheap.
+
+        Args:
+            term_id (int): Term id.
+            doc_ids (np.ndarray): Sorted document ids.
+
+        Returns:
+            np.ndarray: float32 weights aligned with `doc_ids` (0 if absent).
+        """
+        arrays = self._arrays
+        out = np.zeros(len(doc_ids), dtype=np.float32)
+        first_block, end_block = arrays["term_blocks"][term_id], arrays["term_blocks"][term_id + 1]
+        if len(doc_ids) == 0 or first_block == end_block:
+            return out
+
+        block_last = arrays["block_last"][first_block:end_block]
+        which = np.searchsorted(block_last, doc_ids)
+        blocks = np.unique(which[which < len(block_last)])
+        if len(blocks) == 0:
+            return out
+
+        # Decode the selected blocks; each continues from the previous block's last id
+        gaps = decode_varints(
+            _gather_ranges(
+                arrays["postings"],
+                arrays["block_offsets"][first_block + blocks],
+                arrays["block_offsets"][first_block + blocks + 1],
+            )
+        )
+        term_start, term_end = arrays["indptr"][term_id], arrays["indptr"][term_id + 1]
+        value_first = term_start + blocks * BLOCK_SIZE
+        counts = np.minimum(value_first + BLOCK_SIZE, term_end) - value_first
+        block_starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        base = np.where(blocks > 0, block_last[np.maximum(blocks - 1, 0)], 0)
+
+        sums = np.cumsum(gaps)
+        before = sums[block_starts] - gaps[block_starts]
+        ids = sums - np.repeat(before - base, counts)
+        positions = np.repeat(value_first - block_starts, counts) + np.arange(len(gaps))
+        weights = arrays["weights"][positions]
+
+        found_at = np.minimum(np.searchsorted(ids, doc_ids), len(ids) - 1)
+        found = ids[found_at] == doc_ids
+        out[found] = weights[found_at[found]]
+        return out
+
+    def query_terms(self, query: str) -> dict[int, int]:
+        """Return term id -> occurrences for the indexed terms of a query."""
+        query_terms = {}
+        for token, count in Counter(tokenize(query)).items():
+            term_id = self.term_id(token)
+            if term_id is not None:
+                query_terms[term_id] = count
+        return query_terms
+
+    def search(self, query: str, num_results: int = 10, prune: bool = False) -> list[dict]:
+        """
+        Search the index and return the best matching documents.
+
+        Args:
+            query (str): The search query.
+            num_results (int): Number of results to return.
+            prune (bool): Use MaxScore pruning (same results).
+
+        Returns:
+            list[dict]: Documents ranked by BM25 score.
+        """
+        return [
+            doc for _, doc in self.search_batch_scored([query], num_results, prune=prune)[0]
+        ]
+
+    def search_batch(
+        self, queries: list[str], num_results: int = 10, prune: bool = False
+    ) -> list[list[dict]]:
+        """
+        Search the index for several queries.
+
+        Args:
+            queries (list[str]): Search queries.
+            num_results (int): Number of results to return per query.
+            prune (bool): Use MaxScore pruning (same results).
+
+        Returns:
+            list[list[dict]]: Ranked documents for each query, in input order.
+        """
+        return [
+            [doc for _, doc in results]
+            for results in self.search_batch_scored(
+                queries, num_results=num_results, prune=prune
+            )
+        ]
+
+    def search_batch_scored(
+        self, queries: list[str], num_results: int = 10, prune: bool = False
+    ) -> list[list[tuple[float, dict]]]:
+        """
+        Score queries term at a time over the decoded postings.
+
+        Scores are accumulated in float32, term by term in ascending id order,
+        like the sparse matrix product of `BM25Index`; they match the index this
+        one was encoded from up to float32 rounding. With `prune`, MaxScore
+        skips documents that cannot enter the top k (see `maxscore_top_k`).
+
+        Args:
+            queries (list[str]): Search queries.
+            num_results (int): Number of results to return per query.
+            prune (bool): Use MaxScore pruning (same results).
+
+        Returns:
+            list[list[tuple[float, dict]]]: Ranked (BM25 score, document) pairs
+                for each query, in input order.
+        """
+        results = []
+        for query in queries:
+            query_terms = self.query_terms(query)
+            if prune:
+                top, top_scores = maxscore_top_k(self, query_terms, num_results)
+            else:
+                scores = np.zeros(len(self.docs), dtype=np.float32)
+                for term_id in sorted(query_terms):
+                    doc_ids, weights = self.postings(term_id)
+                    # Repeated query words weigh once per occurrence
+                    scores[doc_ids] += weights * np.float32(query_terms[term_id])
+
+                matched = np.flatnonzero(scores > 0)
+                top = BM25Index.top_k(matched, scores[matched], num_results)
+                top_scores = scores[top]
+
+            results.append(
+                [(score, self.docs[i]) for i, score in zip(top.tolist(), top_scores.tolist())]
+            )
+
+        return results
+
+    def to_bm25(self) -> BM25Index:
+        """
+        Decode the index back into a `BM25Index` (for updates).
+
+        Returns:
+            BM25Index: Equivalent in-memory index.
+        """
+        arrays = self._arrays
+        index = BM25Index(self.text_fields, self.field_weights, k1=self.k1, b=self.b)
+        terms, offsets = arrays["terms"].tobytes(), arrays["term_offsets"]
+        index.vocabulary = {
+            terms[offsets[i] : offsets[i + 1]].decode("utf-8"): i
+            for i in range(self._meta["n_terms"])
+        }
+        index.docs = list(self.docs)
+        shape = (self._meta["n_terms"], self._meta["n_docs"])
+
+        for field in self.text_fields:
+            indptr = arrays[f"{field}.indptr"]
+            indices = _decode_rows(
+                arrays[f"{field}.postings"], arrays[f"{field}.posting_offsets"], indptr
+            )
+            counts = decode_varints(arrays[f"{field}.counts"]).astype(np.float32)
+            index.term_counts[field] = sparse.csr_matrix(
+                (counts, indices, np.array(indptr)), shape=shape
+            )
+            index.doc_lengths[field] = np.array(arrays[f"{field}.lengths"])
+
+        indices = _decode_rows(arrays["postings"], arrays["posting_offsets"], arrays["indptr"])
+        index.term_doc_matrix = sparse.csr_matrix(
+            (np.array(arrays["weights"]), indices, np.array(arrays["indptr"])), shape=shape
+        )
+        return index
+
+    def updated(
+        self,
+        added: list[dict],
+        removed: set[tuple[str | None, str]],
+    ) -> BM25Index:
+        """
+        Return an in-memory `BM25Index` with documents added and removed.
+
+        See `BM25Index.updated`; re-encode the result to get a compact index.
+        """
+        return self.to_bm25().updated(added, removed)
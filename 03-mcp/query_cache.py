@@ -0,0 +1,140 @@
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different spellings share a cache entry.
+
+    Args:
+        query (str): Raw search query.
+
+    Returns:
+        str: Lowercased query with collapsed whitespace.
+    """
+    return " ".join(query.lower().split())
+
+
+def index_refs(index: Any) -> tuple:
+    """
+    Return weak references to an index (item by item for tuples).
+
+    Objects that cannot be weakly referenced (e.g. None) are kept as they are;
+    they are not shards and hold no index data.
+    """
+    items = index if isinstance(index, tuple) else (index,)
+    refs = []
+    for item in items:
+        try:
+            refs.append(weakref.ref(item))
+        except TypeError:
+            refs.append(item)
+    return tuple(refs)
+
+
+def same_index(refs: tuple, index: Any) -> bool:
+    """Tell whether references from `index_refs` still point to the objects of an index."""
+    items = index if isinstance(index, tuple) else (index,)
+    return len(refs) == len(items) and all(
+        (ref() if isinstance(ref, weakref.ref) else ref) is item
+        for ref, item in zip(refs, items)
+    )
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of search results keyed by query, top_k and scope.
+
+    Each entry remembers the index it was computed against, e.g. the tuple of
+    shards a search covered. A lookup against a different index (rebuilt,
+    reloaded or swapped) drops the entry and misses, so stale results are never
+    served, while entries over indexes that did not change stay valid. The
+    index is only weakly referenced, so replaced shards are freed as soon as
+    the state that used them is gone, not when their entries are evicted.
+
+    Attributes:
+        max_size (int): Maximum number of cached queries.
+        stale (int): Entries dropped because their index changed.
+        hits (int): Number of cache hits.
+        misses (int): Number of cache misses.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.stale = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int, tuple], tuple[tuple, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, index: Any, query: str, top_k: int, scope: tuple = ()) -> Any | None:
+        """
+        Look up cached results for a query against an index.
+
+        Args:
+            index (Any): The index the caller is about to search (an object or
+                a tuple of objects, compared by identity).
+            query (str): Search query.
+            top_k (int): Number of results requested.
+            scope (tuple): Anything else the results depend on (e.g. a repo filter).
+
+        Returns:
+            Any | None: Cached results, or None on a miss.
+        """
+        with self._lock:
+            key = (normalize_query(query), top_k, scope)
+            entry = self._entries.get(key)
+            if entry is not None and not same_index(entry[0], index):
+                del self._entries[key]
+                self.stale += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self, index: Any, query: str, top_k: int, results: Any, scope: tuple = ()
+    ) -> None:
+        """
+        Store results for a query computed against an index.
+
+        Args:
+            index (Any): The index the results were computed against.
+            query (str): Search query.
+            top_k (int): Number of results requested.
+            results (Any): Results to cache.
+            scope (tuple): Anything else the results depend on (e.g. a repo filter).
+        """
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            key = (normalize_query(query), top_k, scope)
+            self._entries[key] = (index_refs(index), results)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Return cache counters.
+
+        Returns:
+            dict: size, max_size, stale, hits, misses and hit_rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "stale": self.stale,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
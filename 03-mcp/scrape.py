@@ -1,32 +1,180 @@
-import requests
+import asyncio
+import threading
+
+import httpx
+
+from page_cache import PageCache
 
 JINA_READER_PREFIX = "https://r.jina.ai/"
 
 
+class PageFetcher:
+    """
+    Fetch page text through a reader service with connection reuse and caching.
+
+    Blocking requests share one pooled `httpx.Client` (thread-safe), and
+    `afetch` shares one `httpx.AsyncClient` per event loop, so repeated fetches
+    reuse open connections to the reader. Successful responses are stored in an
+    optional `PageCache`, so repeated scrapes of the same URL do not hit the
+    network until the entry expires.
+
+    Attributes:
+        reader_prefix (str): Prefix prepended to each URL (e.g. a local stand-in).
+        cache (PageCache | None): On-disk page cache.
+    """
+
+    def __init__(
+        self,
+        reader_prefix: str = JINA_READER_PREFIX,
+        timeout: float = 30,
+        max_connections: int = 16,
+        cache: PageCache | None = None,
+    ):
+        self.reader_prefix = reader_prefix
+        self.cache = cache
+        self._client_options = {
+            "headers": {"User-Agent": "Mozilla/5.0"},
+            "timeout": timeout,
+            "follow_redirects": True,
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        }
+        self._client = httpx.Client(**self._client_options)
+        # Async connections belong to the event loop that opened them
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+
+    def _reader_url(self, url: str) -> str:
+        """Validate a page URL and return the reader URL that fetches it."""
+        if not url.startswith(("http://", "https://")):
+            raise ValueError("URL must start with http or https")
+        return f"{self.reader_prefix}{url}"
+
+    def fetch(self, url: str) -> str:
+        """
+        Fetch the text of a web page, from the cache when possible.
+
+        Args:
+            url (str): The URL of the page to fetch.
+
+        Returns:
+            str: The page content returned by the reader.
+
+        Raises:
+            ValueError: If the URL does not start with http or https.
+            httpx.HTTPError: If the request to the reader fails.
+        """
+        reader_url = self._reader_url(url)
+
+        if self.cache is not None:
+            text = self.cache.get(url)
+            if text is not None:
+                return text
+
+        response = self._client.get(reader_url)
+        response.raise_for_status()  # Raise an error for bad responses
+
+        if self.cache is not None:
+            self.cache.put(url, response.text)
+        return response.text
+
+    async def afetch(self, url: str) -> str:
+        """
+        Fetch the text of a web page without blocking the event loop.
+
+        The request goes through the async client; cache reads and writes (disk
+        I/O) run in a worker thread.
+
+        Args:
+            url (str): The URL of the page to fetch.
+
+        Returns:
+            str: The page content returned by the reader.
+
+        Raises:
+            ValueError: If the URL does not start with http or https.
+            httpx.HTTPError: If the request to the reader fails.
+        """
+        reader_url = self._reader_url(url)
+
+        if self.cache is not None:
+            text = await asyncio.to_thread(self.cache.get, url)
+            if text is not None:
+                return text
+
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(**self._client_options)
+            self._async_loop = loop
+        response = await self._async_client.get(reader_url)
+        response.raise_for_status()
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, url, response.text)
+        return response.text
+
+    async def fetch_many(self, urls: list[str], max_concurrency: int = 8) -> list[dict]:
+        """
+        Fetch several pages concurrently.
+
+        At most `max_concurrency` requests are in flight on the shared async
+        client. A failing URL does not fail the others.
+
+        Args:
+            urls (list[str]): URLs to fetch.
+            max_concurrency (int): Maximum number of simultaneous fetches.
+
+        Returns:
+            list[dict]: {"url", "content"} or {"url", "error"} per URL, in input order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch_one(url: str) -> dict:
+            async with semaphore:
+                try:
+                    return {"url": url, "content": await self.afetch(url)}
+                except (ValueError, httpx.HTTPError) as exc:
+                    return {"url": url, "error": f"{type(exc).__name__}: {exc}"}
+
+        return list(await asyncio.gather(*(fetch_one(url) for url in urls)))
+
+    def close(self) -> None:
+        """Close the pooled blocking connections."""
+        self._client.close()
+
+    async def aclose(self) -> None:
+        """Close the pooled async connections (from the loop that opened them)."""
+        if self._async_client is not None and self._async_loop is asyncio.get_running_loop():
+            await self._async_client.aclose()
+        self._async_client = self._async_loop = None
+
+
+_default_fetcher: PageFetcher | None = None
+_default_lock = threading.Lock()
+
+
 def fetch_page(url: str, timeout: int = 30) -> str:
     """
     Fetch the content of a web page using the Jina render service.
 
+    Uses a shared, uncached `PageFetcher` so connections are reused across calls.
+
     Args:
         url (str): The URL of the page to fetch.
+        timeout (int): Request timeout in seconds (used when the shared fetcher
+            is created).
 
     Returns:
-        str: The HTML content of the page.
+        str: The content of the page.
 
     Raises:
         ValueError: If the URL does not start with http or https.
-        requests.exceptions.RequestException: If the request to Jina fails.
+        httpx.HTTPError: If the request to Jina fails.
     """
-    # Validate the URL starts with http or https
-    if not url.startswith(("http://", "https://")):
-        raise ValueError("URL must start with http or https")
-    # Construct the full Jina URL
-    jina_url = f"{JINA_READER_PREFIX}{url}"
-    # Make the GET request to fetch the page content
-    response: requests.Response = requests.get(
-        jina_url,
-        headers={"User-Agent": "Mozilla/5.0"},
-        timeout=timeout,
-    )
-    response.raise_for_status()  # Raise an error for bad responses
-    return response.text
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = PageFetcher(timeout=timeout)
+    return _default_fetcher.fetch(url)
@@ -1,35 +1,36 @@
-import requests
+import heapq
+import itertools
 import os
 import zipfile
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor
 from pathlib import PurePosixPath
 
+import numpy as np
+from minsearch import Index
+
+from bm25 import BM25Index
+from download import download_zip_files
+from postings import CompactIndex
+
+DEFAULT_DOC_EXTENSIONS = (".md", ".mdx")
+
 
 def download_zip_file_from_url(url: str, path: str, filename: str) -> None:
     """
-    Download a ZIP file from a URL and save it locally if it does not already exist.
+    Download a ZIP file from a URL, or revalidate the cached copy if it exists.
+
+    Cached archives are refreshed only when the server reports a change
+    (ETag / Last-Modified), and interrupted downloads are resumed.
 
     Args:
         url (str): URL of the ZIP file.
         path (str): Local directory where the ZIP will be saved.
         filename (str): Name of the ZIP file (must end with .zip).
     """
-    if not filename.endswith(".zip"):
-        raise ValueError("Filename must end with .zip")
-
-    os.makedirs(path, exist_ok=True)
-    zip_path = os.path.join(path, filename)
+    download_zip_files([{"url": url, "filename": filename}], path)
 
-    if os.path.exists(zip_path):
-        return  # idempotent by design
 
-    with requests.get(url, stream=True, timeout=30) as response:
-        response.raise_for_status()
-        with open(zip_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:  # avoid keep-alive chunks
-                    f.write(chunk)
-                    
-                    
 def discover_zip_root(path: str, filename: str) -> str:
     """
     Discover the single top-level directory inside a ZIP file.
@@ -83,7 +84,7 @@ def parse_zip_file(
         raise FileNotFoundError(f"The file {zip_file_path} does not exist.")
 
     md_files: list[str] = []
-    extensions = tuple(extensions) if extensions else (".md", ".mdx")
+    extensions = tuple(extensions) if extensions else DEFAULT_DOC_EXTENSIONS
 
     with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
         for name in zip_ref.namelist():
@@ -126,11 +127,13 @@ def create_docs_from_zip_file(
     zip_archive_path = os.path.join(zip_archive_path, zip_archive_filename)
 
     with zipfile.ZipFile(zip_archive_path, "r") as zip_ref:
+        entry_names = set(zip_ref.namelist())
+
         for markdown_file_path in markdown_file_paths:
             doc: dict = {}
             zip_entry_path = PurePosixPath(root_directory) / markdown_file_path
 
-            if str(zip_entry_path) not in zip_ref.namelist():
+            if str(zip_entry_path) not in entry_names:
                 continue  # defensive; should not happen if earlier steps are correct
 
             with zip_ref.open(str(zip_entry_path)) as f:
@@ -141,41 +144,357 @@ def create_docs_from_zip_file(
 
     return docs_list
 
-from minsearch import Index
-def create_search_index(documents: list[dict[str, str]]) -> Index:
+
+def _iter_doc_entries(
+    zip_ref: zipfile.ZipFile,
+    extensions: tuple[str, ...],
+) -> Iterator[tuple[zipfile.ZipInfo, str]]:
+    """
+    Walk the central directory once and yield the document entries.
+
+    Args:
+        zip_ref (zipfile.ZipFile): Open archive.
+        extensions (tuple[str, ...]): File extensions to keep.
+
+    Yields:
+        tuple[zipfile.ZipInfo, str]: Entry and its path without the root directory.
+
+    Raises:
+        ValueError: If the ZIP is empty or does not contain a single root directory.
+    """
+    root: str | None = None
+
+    for info in zip_ref.infolist():
+        parts = PurePosixPath(info.filename).parts
+        if not parts:
+            continue
+
+        if root is None:
+            root = parts[0]
+        elif parts[0] != root:
+            raise ValueError(
+                f"Expected a single root directory, found: {sorted({root, parts[0]})}"
+            )
+
+        # Remove the first path component (e.g. "fastmcp-main/")
+        if info.is_dir() or len(parts) < 2:
+            continue
+        if not info.filename.endswith(extensions):
+            continue
+
+        yield info, str(PurePosixPath(*parts[1:]))
+
+    if root is None:
+        raise ValueError("The ZIP file is empty.")
+
+
+def iter_docs_from_zip_file(
+    path: str,
+    filename: str,
+    extensions: list[str] | tuple[str, ...] | None = None,
+    only: set[str] | None = None,
+) -> Iterator[dict[str, str]]:
+    """
+    Stream decoded documents out of a ZIP archive in a single pass.
+
+    The archive is opened once and its central directory walked once: the root
+    directory is discovered, entries are filtered by extension and decoded as
+    they are reached. This replaces the discover/parse/create sequence, which
+    opened the archive three times.
+
+    Args:
+        path (str): Local directory containing the ZIP file.
+        filename (str): ZIP file name.
+        extensions (list[str] | tuple[str, ...] | None): File extensions to keep.
+            Defaults to Markdown (.md, .mdx).
+        only (set[str] | None): If given, decode only these normalized paths.
+
+    Yields:
+        dict[str, str]: {"filename": normalized_path, "content": content}
+
+    Raises:
+        FileNotFoundError: If the ZIP file does not exist.
+        ValueError: If the ZIP is empty or does not contain a single root directory.
+    """
+    zip_file_path = os.path.join(path, filename)
+    if not os.path.exists(zip_file_path):
+        raise FileNotFoundError(f"The file {zip_file_path} does not exist.")
+
+    extensions = tuple(extensions) if extensions else DEFAULT_DOC_EXTENSIONS
+
+    with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
+        for info, doc_filename in _iter_doc_entries(zip_ref, extensions):
+            if only is not None and doc_filename not in only:
+                continue
+
+            with zip_ref.open(info) as f:
+                content = f.read().decode("utf-8", errors="replace")
+
+            yield {"filename": doc_filename, "content": content}
+
+
+def read_zip_manifest(
+    path: str,
+    filename: str,
+    extensions: list[str] | tuple[str, ...] | None = None,
+) -> dict[str, tuple[int, int]]:
+    """
+    Read the CRC32 and size of every document entry without decompressing.
+
+    Both values come from the ZIP central directory, so comparing two manifests
+    tells which documents were added, changed or removed between two versions of
+    an archive at the cost of a directory listing.
+
+    Args:
+        path (str): Local directory containing the ZIP file.
+        filename (str): ZIP file name.
+        extensions (list[str] | tuple[str, ...] | None): File extensions to keep.
+            Defaults to Markdown (.md, .mdx).
+
+    Returns:
+        dict[str, tuple[int, int]]: Normalized path -> (CRC32, uncompressed size).
+
+    Raises:
+        FileNotFoundError: If the ZIP file does not exist.
+        ValueError: If the ZIP is empty or does not contain a single root directory.
     """
-    Create a search index from a list of document dictionaries.
+    zip_file_path = os.path.join(path, filename)
+    if not os.path.exists(zip_file_path):
+        raise FileNotFoundError(f"The file {zip_file_path} does not exist.")
+
+    extensions = tuple(extensions) if extensions else DEFAULT_DOC_EXTENSIONS
+
+    with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
+        return {
+            doc_filename: (info.CRC, info.file_size)
+            for info, doc_filename in _iter_doc_entries(zip_ref, extensions)
+        }
+
+
+def diff_manifests(
+    old: dict[str, tuple[int, int]],
+    new: dict[str, tuple[int, int]],
+) -> tuple[set[str], set[str], set[str]]:
+    """
+    Compare two archive manifests.
+
+    Args:
+        old (dict[str, tuple[int, int]]): Manifest of the indexed archive.
+        new (dict[str, tuple[int, int]]): Manifest of the refreshed archive.
+
+    Returns:
+        tuple[set[str], set[str], set[str]]: Added, changed and removed paths.
+    """
+    added = new.keys() - old.keys()
+    removed = old.keys() - new.keys()
+    changed = {name for name in new.keys() & old.keys() if new[name] != old[name]}
+    return set(added), changed, set(removed)
+
+
+SEARCH_BACKENDS = ("minsearch", "bm25")
+
+
+def create_search_index(
+    documents: Iterable[dict[str, str]],
+    backend: str = "minsearch",
+    field_weights: dict[str, float] | None = None,
+) -> Index | BM25Index:
+    """
+    Create a search index from document dictionaries.
 
     Args:
-        documents (list[dict[str, str]]): List of documents with 'filename' and 'content' fields.
+        documents (Iterable[dict[str, str]]): Documents with 'filename' and 'content'
+            fields. Generators are consumed once.
+        backend (str): "minsearch" (TF-IDF) or "bm25" (native sparse BM25 engine).
+        field_weights (dict[str, float] | None): Per-field score weights
+            (bm25 backend only).
 
     Returns:
-        Index: The search index.
+        Index | BM25Index: The search index.
     """
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown search backend: {backend}")
+
     # Sort the documents by filename
     sorted_documents = sorted(documents, key=lambda doc: doc['filename'])
 
     # Create the search index
     text_fields = ['filename', 'content']
-    index = Index(text_fields=text_fields)
+    if backend == "bm25":
+        index = BM25Index(text_fields=text_fields, field_weights=field_weights)
+    else:
+        index = Index(text_fields=text_fields)
     index.fit(sorted_documents)
     return index
 
 
 def search_index(
-    index: Index, query: str, top_k: int = 5
+    index: Index | BM25Index | CompactIndex, query: str, top_k: int = 5
 ) -> list[dict]:
     """
-    Search the minsearch index for the given query and return the top_k results.
+    Search the index for the given query and return the top_k results.
 
     Args:
-        index (Index): The search index.
+        index (Index | BM25Index | CompactIndex): The search index.
         query (str): The search query.
         top_k (int): Number of top results to return.
 
     Returns:
-        list[dict]: Ranked search results from minsearch.
+        list[dict]: Ranked search results.
     """
-    # Search the index for the given query
-    # and return the top_k results
+    # Both backends share the minsearch search signature
     return index.search(query, num_results=top_k)
+
+
+def _sparse_nbytes(matrix) -> int:
+    """Return the memory used by the arrays of a scipy sparse matrix."""
+    return sum(
+        getattr(matrix, name).nbytes
+        for name in ("data", "indices", "indptr")
+        if hasattr(matrix, name)
+    )
+
+
+def index_stats(index: Index | BM25Index | CompactIndex | None) -> dict:
+    """
+    Describe the size of a search index.
+
+    Args:
+        index (Index | BM25Index | CompactIndex | None): The search index.
+
+    Returns:
+        dict: backend, documents, vocabulary (distinct terms) and bytes held by
+            the sparse matrices (or the compact buffers; `mapped` tells whether
+            they are a shared memory map).
+    """
+    if index is None:
+        return {"backend": None, "documents": 0, "vocabulary": 0, "bytes": 0}
+
+    if isinstance(index, CompactIndex):
+        return {
+            "backend": "bm25",
+            "documents": len(index.docs),
+            "vocabulary": index.n_terms,
+            "bytes": index.nbytes,
+            "mapped": index.path is not None,
+        }
+
+    if isinstance(index, BM25Index):
+        matrices = [index.term_doc_matrix, *index.term_counts.values()]
+        return {
+            "backend": "bm25",
+            "documents": len(index.docs),
+            "vocabulary": len(index.vocabulary),
+            "bytes": sum(_sparse_nbytes(matrix) for matrix in matrices),
+        }
+
+    vectorizers = getattr(index, "vectorizers", {})
+    return {
+        "backend": "minsearch",
+        "documents": len(index.docs),
+        "vocabulary": sum(
+            len(getattr(vectorizer, "vocabulary_", {})) for vectorizer in vectorizers.values()
+        ),
+        "bytes": sum(
+            _sparse_nbytes(matrix) for matrix in getattr(index, "text_matrices", {}).values()
+        ),
+    }
+
+
+def search_index_scored(
+    index: Index | BM25Index | CompactIndex,
+    queries: list[str],
+    top_k: int = 5,
+    prune: bool = False,
+) -> list[list[tuple[float, dict]]]:
+    """
+    Search the index for several queries and return scores with the results.
+
+    The bm25 backend reports its BM25 scores. For minsearch the scores of the
+    returned documents are recomputed from its TF-IDF matrices (the sum of the
+    per-field cosine similarities, which is what it ranks by).
+
+    Args:
+        index (Index | BM25Index | CompactIndex): The search index.
+        queries (list[str]): Search queries.
+        top_k (int): Number of top results to return per query.
+        prune (bool): Use MaxScore pruning (same results, fewer postings
+            scored) for a single query on a sparse bm25 index. Batches keep
+            the single matrix product, and compact indexes and minsearch
+            ignore it.
+
+    Returns:
+        list[list[tuple[float, dict]]]: Ranked (score, document) pairs for each
+            query, in input order.
+    """
+    if isinstance(index, BM25Index):
+        prune = prune and len(queries) == 1
+        return index.search_batch_scored(queries, num_results=top_k, prune=prune)
+    if isinstance(index, CompactIndex):
+        # Extra block lookups outweigh the skipped postings on typical queries
+        return index.search_batch_scored(queries, num_results=top_k)
+
+    batch_results = []
+    for query in queries:
+        doc_ids = [hit["_id"] for hit in index.search(query, num_results=top_k, output_ids=True)]
+        scores = np.zeros(len(doc_ids))
+        if doc_ids:
+            for field in index.text_fields:
+                # TF-IDF rows are L2-normalized, so the dot product is the cosine
+                query_vec = index.vectorizers[field].transform([query])
+                scores += (index.text_matrices[field][doc_ids] @ query_vec.T).toarray().ravel()
+        batch_results.append(
+            [(float(score), index.docs[doc_id]) for score, doc_id in zip(scores, doc_ids)]
+        )
+    return batch_results
+
+
+def search_shards(
+    shards: list[Index | BM25Index | CompactIndex],
+    queries: list[str],
+    top_k: int = 5,
+    executor: Executor | None = None,
+    prune: bool = False,
+) -> list[list[dict]]:
+    """
+    Search several index shards and merge their top-k results by score.
+
+    Each shard returns its own ranked top-k; the sorted lists are merged with a
+    heap, so only `top_k` results per query are taken from all the shards. Ties
+    keep shard order. Shards are searched concurrently when an executor is
+    given and there is more than one.
+
+    Shards are fitted separately, so each scores with its own term statistics
+    (IDF, average document length). Results are exact within a shard and
+    comparable across shards to the extent their statistics are similar.
+
+    Args:
+        shards (list[Index | BM25Index | CompactIndex]): Shards to search, in
+            tie-break order.
+        queries (list[str]): Search queries.
+        top_k (int): Number of top results to return per query.
+        executor (Executor | None): Pool used to search the shards in parallel.
+        prune (bool): Use MaxScore pruning where it pays (see
+            `search_index_scored`).
+
+    Returns:
+        list[list[dict]]: Merged search results for each query, in input order.
+    """
+    def search_shard(shard):
+        return search_index_scored(shard, queries, top_k=top_k, prune=prune)
+
+    if executor is not None and len(shards) > 1:
+        per_shard = list(executor.map(search_shard, shards))
+    else:
+        per_shard = [search_shard(shard) for shard in shards]
+
+    return [
+        [
+            doc
+            for _, doc in itertools.islice(
+                heapq.merge(*(results[i] for results in per_shard), key=lambda hit: -hit[0]),
+                top_k,
+            )
+        ]
+        for i in range(len(queries))
+    ]
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import Any
+
+# Bump whenever the layout of a snapshot payload changes so stale files are ignored.
+SNAPSHOT_VERSION = 9
+
+
+def file_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 checksum of a file.
+
+    Args:
+        path (str): Path to the file.
+        chunk_size (int): Number of bytes read per iteration.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_key(**parts: Any) -> str:
+    """
+    Build a stable key from the inputs a snapshot depends on.
+
+    Args:
+        **parts: JSON-serializable values (checksums, extensions, config sections).
+
+    Returns:
+        str: Hex digest identifying this combination of inputs.
+    """
+    payload = json.dumps(
+        {"version": SNAPSHOT_VERSION, **parts},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_snapshot(path: str, key: str | None) -> Any | None:
+    """
+    Load a snapshot payload if it exists and was written for the given key.
+
+    Args:
+        path (str): Snapshot file path.
+        key (str | None): Expected snapshot key, or None to accept whatever
+            inputs the snapshot was built for (e.g. in a process that only
+            serves what another process ingested).
+
+    Returns:
+        Any | None: The stored payload, or None if missing, stale or unreadable.
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None  # corrupt or written by incompatible code; rebuild
+
+    if not isinstance(snapshot, dict):
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    if key is not None and snapshot.get("key") != key:
+        return None
+
+    return snapshot["payload"]
+
+
+def save_snapshot(path: str, key: str, payload: Any) -> None:
+    """
+    Atomically write a snapshot payload to disk.
+
+    Args:
+        path (str): Snapshot file path.
+        key (str): Key the payload was built for.
+        payload (Any): Picklable payload.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        pickle.dump(
+            {"version": SNAPSHOT_VERSION, "key": key, "payload": payload},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+    os.replace(tmp_path, path)  # readers never see a half-written file
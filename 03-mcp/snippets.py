@@ -0,0 +1,136 @@
+import bisect
+import re
+from array import array
+from collections.abc import Sequence
+
+from bm25 import tokenize
+
+# A line or a sentence starts after each of these
+BOUNDARY_PATTERN = re.compile(rb"\n|[.!?][ \t]+")
+
+# Passages are only scanned this far for query terms
+MAX_SCAN_BYTES = 64 * 1024
+MAX_MATCHES = 256
+
+
+def sentence_starts(content: str) -> array:
+    """
+    Find where the lines and sentences of a document start.
+
+    Computed once at ingest time, so snippets can be aligned to sentences
+    without splitting the text again for every search result.
+
+    Args:
+        content (str): Document text.
+
+    Returns:
+        array: Sorted UTF-8 byte offsets (unsigned 32-bit), starting with 0.
+    """
+    encoded = content.encode("utf-8")
+    return array("I", [0, *(match.end() for match in BOUNDARY_PATTERN.finditer(encoded))])
+
+
+def query_pattern(query: str) -> re.Pattern | None:
+    """
+    Compile a pattern that finds the terms of a query in UTF-8 text.
+
+    Terms are tokenized like the index does and matched case-insensitively as
+    whole words.
+
+    Args:
+        query (str): Search query.
+
+    Returns:
+        re.Pattern | None: Bytes pattern, or None if the query has no terms.
+    """
+    terms = sorted(set(tokenize(query)), key=len, reverse=True)
+    if not terms:
+        return None
+    alternation = b"|".join(re.escape(term.encode("utf-8")) for term in terms)
+    return re.compile(rb"(?<!\w)(?:" + alternation + rb")(?!\w)", re.IGNORECASE)
+
+
+def make_snippet(
+    data: bytes,
+    base: int,
+    starts: Sequence[int] | None,
+    pattern: re.Pattern | None,
+    size: int,
+    highlight: str = "**",
+) -> str:
+    """
+    Cut the window of a passage where the query terms are densest.
+
+    Candidate windows start at the sentence (or line) holding a match, or a
+    little before the match if that sentence starts too far back. The window
+    with the most distinct terms wins, then the most matches, then the first
+    one. It ends at the last sentence boundary that fits, or between words if
+    that would keep less than half of it. Without matches the snippet is the
+    start of the passage.
+
+    Args:
+        data (bytes): UTF-8 text of the passage.
+        base (int): Byte offset of the passage in its document.
+        starts (Sequence[int] | None): Sentence start offsets of the document
+            (see `sentence_starts`), or None if unknown.
+        pattern (re.Pattern | None): Query pattern from `query_pattern`.
+        size (int): Snippet budget in bytes (about as many characters).
+        highlight (str): Marker put around each match; empty to disable.
+
+    Returns:
+        str: The snippet.
+    """
+    data = data[:MAX_SCAN_BYTES]
+    matches = []
+    if pattern is not None:
+        for _, match in zip(range(MAX_MATCHES), pattern.finditer(data)):
+            matches.append(match.span())
+    terms = [data[start:end].lower() for start, end in matches]
+
+    # Sentence starts relative to the passage
+    boundaries = [0]
+    if starts is not None:
+        first = bisect.bisect_right(starts, base)
+        last = bisect.bisect_left(starts, base + len(data))
+        boundaries += [offset - base for offset in starts[first:last]]
+
+    candidates = []
+    for match_start, _ in matches:
+        sentence = boundaries[bisect.bisect_right(boundaries, match_start) - 1]
+        # A long sentence (or code line) would push the match out of the window
+        if match_start - sentence < size * 3 // 4:
+            candidates.append(sentence)
+        else:
+            # Start at a word, not inside one
+            space = data.find(b" ", match_start - size // 4, match_start)
+            candidates.append(match_start - size // 4 if space < 0 else space + 1)
+
+    match_starts = [start for start, _ in matches]
+    window, best = 0, (0, 0)
+    for candidate in sorted(set(candidates)):
+        first = bisect.bisect_left(match_starts, candidate)
+        last = bisect.bisect_right(match_starts, candidate + size)
+        inside = [i for i in range(first, last) if matches[i][1] <= candidate + size]
+        score = (len({terms[i] for i in inside}), len(inside))
+        if score > best:
+            window, best = candidate, score
+
+    limit = min(window + size, len(data))
+    boundary = boundaries[bisect.bisect_right(boundaries, limit) - 1]
+    if limit >= len(data):
+        end = limit
+    elif boundary > window + size // 2:
+        end = boundary
+    else:
+        # No sentence ends late enough; end between words instead
+        space = data.rfind(b" ", window + size // 2, limit)
+        end = limit if space < 0 else space
+
+    marker = highlight.encode("utf-8")
+    pieces, position = [], window
+    for start, stop in matches:
+        if start >= window and stop <= end:
+            pieces += [data[position:start], marker, data[start:stop], marker]
+            position = stop
+    pieces.append(data[position:end])
+    return b"".join(pieces).decode("utf-8", errors="ignore").strip()
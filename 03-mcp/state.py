@@ -0,0 +1,136 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from file_index import FileIndex
+from store import DocumentStore
+from web_corpus import WEB_REPO
+
+
+@dataclass(frozen=True)
+class IndexState:
+    """
+    Everything the MCP tools read to answer a call.
+
+    States are never modified once published: ingestion builds a new state and
+    replaces the module-level reference in one assignment, so a tool call that
+    grabbed a state keeps a consistent view until it returns.
+
+    Attributes:
+        shards (dict[str, Any]): Search index shard of each repository, in config
+            order. While ingesting it only holds the repositories indexed so far.
+        code_shards (dict[str, dict[str, Any]]): Index shard of the fenced code
+            blocks of each repository, per normalized language (empty unless
+            code block indexing is enabled).
+        documents (list[dict]): Metadata of the indexed repository documents.
+        document_store (DocumentStore): Repository document contents.
+        file_index (FileIndex): Filename lookups (the web pages, if any, layered
+            over the repository files).
+        repos (tuple[str, ...]): Repositories covered by this state.
+        manifests (dict[str, dict[str, tuple[int, int]]]): (CRC32, size) of each
+            indexed archive entry per repository, used to diff refreshed archives.
+        ready (bool): True once the full index is available.
+        web_documents (list[dict]): Metadata of the indexed scraped pages. They
+            are kept apart from the repository documents, so indexing a page
+            only touches the web part of the state (its shard is `shards["web"]`).
+        web_store (DocumentStore): Contents of the indexed scraped pages.
+    """
+
+    shards: dict[str, Any] = field(default_factory=dict)
+    code_shards: dict[str, dict[str, Any]] = field(default_factory=dict)
+    documents: list[dict] = field(default_factory=list)
+    document_store: DocumentStore = field(default_factory=DocumentStore)
+    file_index: FileIndex = field(default_factory=FileIndex)
+    repos: tuple[str, ...] = ()
+    manifests: dict[str, dict[str, tuple[int, int]]] = field(default_factory=dict)
+    ready: bool = False
+    web_documents: list[dict] = field(default_factory=list)
+    web_store: DocumentStore = field(default_factory=DocumentStore)
+
+    def store(self, repo: str) -> DocumentStore:
+        """Return the document store that holds the documents of a repository."""
+        return self.web_store if repo == WEB_REPO else self.document_store
+
+
+class IngestProgress:
+    """
+    Thread-safe progress report of the background ingestion.
+
+    Attributes:
+        stage (str): pending, downloading, ingesting, indexing, saving, ready or failed.
+        repos_total (int): Number of configured repositories.
+        repos_indexed (int): Repositories already searchable.
+        documents (int): Documents ingested so far.
+        error (str | None): Error message if ingestion failed.
+        stage_seconds (dict[str, float]): Time spent in each stage of the last run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage = "pending"
+        self.repos_total = 0
+        self.repos_indexed = 0
+        self.documents = 0
+        self.error: str | None = None
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.stage_seconds: dict[str, float] = {}
+        self._stage_started: float | None = None
+
+    def _end_stage(self, now: float) -> None:
+        """Add the time spent in the current stage to `stage_seconds`."""
+        if self._stage_started is not None:
+            elapsed = now - self._stage_started
+            self.stage_seconds[self.stage] = self.stage_seconds.get(self.stage, 0.0) + elapsed
+            self._stage_started = None
+
+    def start(self, repos_total: int) -> None:
+        """Reset counters at the beginning of an ingestion run."""
+        with self._lock:
+            self.stage = "downloading"
+            self.repos_total = repos_total
+            self.repos_indexed = 0
+            self.documents = 0
+            self.error = None
+            self.started_at = time.time()
+            self.finished_at = None
+            self.stage_seconds = {}
+            self._stage_started = time.perf_counter()
+
+    def update(self, **changes: Any) -> None:
+        """Update one or more progress fields."""
+        with self._lock:
+            if changes.get("stage", self.stage) != self.stage:
+                now = time.perf_counter()
+                self._end_stage(now)
+                self._stage_started = now
+            for name, value in changes.items():
+                setattr(self, name, value)
+            if self.stage in ("ready", "failed"):
+                self.finished_at = time.time()
+                self._stage_started = None  # the run is over; stop the clock
+
+    def repo_done(self, documents: int) -> None:
+        """Record one more searchable repository."""
+        with self._lock:
+            self.repos_indexed += 1
+            self.documents += documents
+
+    def as_dict(self) -> dict:
+        """Return the progress as a plain dictionary."""
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "stage": self.stage,
+                "repos_total": self.repos_total,
+                "repos_indexed": self.repos_indexed,
+                "documents": self.documents,
+                "elapsed_seconds": round(end - self.started_at, 3)
+                if self.started_at
+                else 0.0,
+                "error": self.error,
+                "stage_seconds": {
+                    stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()
+                },
+            }
@@ -0,0 +1,406 @@
+import codecs
+import threading
+import zlib
+import zipfile
+from array import array
+from collections import OrderedDict
+from pathlib import PurePosixPath
+
+
+def _pack_outline(size: int, outline: list[dict]) -> tuple[int, bytes, array, array, str]:
+    """Pack an outline into columns: levels, starts, ends, then titles and ids."""
+    # Headings are single lines, so a newline separates their titles and ids
+    return (
+        size,
+        bytes(heading["level"] for heading in outline),
+        array("I", [heading["start"] for heading in outline]),
+        array("I", [heading["end"] for heading in outline]),
+        "\n".join([*(h["title"] for h in outline), *(h["id"] for h in outline)]),
+    )
+
+
+def _unpack_outline(record: tuple[int, bytes, array, array, str]) -> tuple[int, list[dict]]:
+    """Rebuild the (size, outline) of a document from its packed columns."""
+    size, levels, starts, ends, names = record
+    count = len(levels)
+    names_list = names.split("\n") if count else []
+    return size, [
+        {
+            "level": levels[i],
+            "title": names_list[i],
+            "id": names_list[count + i],
+            "start": starts[i],
+            "end": ends[i],
+        }
+        for i in range(count)
+    ]
+
+
+class DocumentStore:
+    """
+    Document contents kept out of the index and decoded on demand.
+
+    Each document is stored either as a reference to its entry in the source ZIP
+    archive or as a zlib-compressed blob. Decoded documents are kept in a bounded
+    LRU cache, so resident memory stays proportional to `cache_size` instead of
+    the corpus. Contents are handled as UTF-8 bytes so callers can slice them with
+    the byte offsets produced by `passages.split_passages`. An optional heading
+    outline (see `passages.build_outline`) and the document size are kept per
+    document, so ranged reads can be planned without decoding anything, and so
+    are optional sentence start offsets (see `snippets.sentence_starts`) used to
+    cut search snippets. Outlines are packed into arrays and one string per
+    document, and only expanded to heading dicts when asked for.
+
+    Attributes:
+        cache_size (int): Maximum number of decoded documents kept in memory.
+        hits (int): Reads served from the decoded cache.
+        misses (int): Reads that had to decompress or read the archive.
+    """
+
+    def __init__(self, cache_size: int = 256):
+        self.cache_size = cache_size
+        self._records: dict[tuple[str, str], bytes | tuple[str, str]] = {}
+        self._outlines: dict[tuple[str, str], tuple[int, bytes, array, array, str]] = {}
+        self._sentences: dict[tuple[str, str], array] = {}
+        self._roots: dict[str, str] = {}
+        self._cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._archives: dict[str, zipfile.ZipFile] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self) -> dict:
+        # Open archives, the cache and the lock are process-local
+        return {
+            "cache_size": self.cache_size,
+            "records": self._records,
+            "outlines": self._outlines,
+            "sentences": self._sentences,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(cache_size=state["cache_size"])
+        self._records = state["records"]
+        self._outlines = state["outlines"]
+        # Older snapshots have none; they are rejected by version after loading
+        self._sentences = state.get("sentences", {})
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._records
+
+    def keys(self):
+        """Return a view of the stored (repo, filename) keys."""
+        return self._records.keys()
+
+    def copy(self) -> "DocumentStore":
+        """
+        Return a store with the same documents and decoded cache.
+
+        Archives are reopened on first read, so the copy sees archives that were
+        refreshed on disk while the original keeps serving from its open handles.
+        Documents added or removed on the copy drop their cache entries, so
+        cached contents of changed files are never served.
+
+        Returns:
+            DocumentStore: The copy.
+        """
+        store = DocumentStore(cache_size=self.cache_size)
+        with self._lock:
+            store._records = dict(self._records)
+            store._outlines = dict(self._outlines)
+            store._sentences = dict(self._sentences)
+            store._cache = OrderedDict(self._cache)
+        return store
+
+    def add_text(
+        self,
+        repo: str,
+        filename: str,
+        content: str,
+        outline: list[dict] | None = None,
+        sentences: array | None = None,
+    ) -> None:
+        """
+        Store a document as a compressed blob.
+
+        Args:
+            repo (str): Repository name.
+            filename (str): Normalized file path inside the repository.
+            content (str): Document text.
+            outline (list[dict] | None): Heading outline of the document.
+            sentences (array | None): Sentence start offsets of the document.
+        """
+        encoded = content.encode("utf-8")
+        blob = zlib.compress(encoded)
+        with self._lock:
+            self._records[(repo, filename)] = blob
+            self._outlines[(repo, filename)] = _pack_outline(len(encoded), outline or [])
+            self._set_sentences((repo, filename), sentences)
+            self._cache.pop((repo, filename), None)
+
+    def add_archive_document(
+        self,
+        repo: str,
+        filename: str,
+        zip_path: str,
+        content: str | None = None,
+        outline: list[dict] | None = None,
+        sentences: array | None = None,
+    ) -> None:
+        """
+        Store a document as a reference into its source ZIP archive.
+
+        Args:
+            repo (str): Repository name.
+            filename (str): Normalized file path (without the archive root directory).
+            zip_path (str): Path to the ZIP archive.
+            content (str | None): Decoded text, used only to record the size.
+            outline (list[dict] | None): Heading outline of the document.
+            sentences (array | None): Sentence start offsets of the document.
+        """
+        with self._lock:
+            self._records[(repo, filename)] = (zip_path, filename)
+            if content is not None:
+                size = len(content.encode("utf-8"))
+                self._outlines[(repo, filename)] = _pack_outline(size, outline or [])
+            self._set_sentences((repo, filename), sentences)
+            self._cache.pop((repo, filename), None)
+
+    def _set_sentences(self, key: tuple[str, str], sentences: array | None) -> None:
+        """Record (or forget) the sentence offsets of a document; the lock is held."""
+        if sentences is None:
+            self._sentences.pop(key, None)
+        else:
+            self._sentences[key] = sentences
+
+    def remove(self, repo: str, filename: str) -> None:
+        """Remove a document from the store if present."""
+        with self._lock:
+            self._records.pop((repo, filename), None)
+            self._outlines.pop((repo, filename), None)
+            self._sentences.pop((repo, filename), None)
+            self._cache.pop((repo, filename), None)
+
+    def outline(self, repo: str, filename: str) -> tuple[int, list[dict]] | None:
+        """
+        Return the size and heading outline recorded for a document.
+
+        Args:
+            repo (str): Repository name.
+            filename (str): Normalized file path inside the repository.
+
+        Returns:
+            tuple[int, list[dict]] | None: (size in UTF-8 bytes, outline), or None
+                if the document is unknown or was stored without an outline.
+        """
+        record = self._outlines.get((repo, filename))
+        return None if record is None else _unpack_outline(record)
+
+    def sentences(self, repo: str, filename: str) -> array | None:
+        """
+        Return the sentence start offsets recorded for a document.
+
+        Args:
+            repo (str): Repository name.
+            filename (str): Normalized file path inside the repository.
+
+        Returns:
+            array | None: Sorted UTF-8 byte offsets, or None if not recorded.
+        """
+        return self._sentences.get((repo, filename))
+
+    def _archive_entry(self, zip_path: str, filename: str) -> tuple[zipfile.ZipFile, str]:
+        """Return the open archive and the entry name of a document."""
+        with self._lock:
+            archive = self._archives.get(zip_path)
+            if archive is None:
+                archive = zipfile.ZipFile(zip_path, "r")
+                self._archives[zip_path] = archive
+                self._roots[zip_path] = PurePosixPath(archive.namelist()[0]).parts[0]
+            return archive, f"{self._roots[zip_path]}/{filename}"
+
+    def _read_archive_entry(self, zip_path: str, filename: str) -> bytes:
+        """Read and normalize one archive entry to UTF-8 bytes."""
+        # ZipFile serializes its own seeks and reads; inflating runs in parallel
+        archive, entry = self._archive_entry(zip_path, filename)
+        raw = archive.read(entry)
+        try:
+            raw.decode("utf-8")
+            return raw
+        except UnicodeDecodeError:
+            # Match the text produced at ingest time so byte offsets line up
+            return raw.decode("utf-8", errors="replace").encode("utf-8")
+
+    def get_bytes(self, repo: str, filename: str) -> bytes | None:
+        """
+        Return the UTF-8 encoded content of a document.
+
+        Args:
+            repo (str): Repository name.
+            filename (str): Normalized file path inside the repository.
+
+        Returns:
+            bytes | None: Encoded content, or None if the document is unknown.
+        """
+        key = (repo, filename)
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return data
+
+            record = self._records.get(key)
+            if record is None:
+                return None
+            self.misses += 1
+
+        # Decode without the lock, so reads of different documents run in parallel
+        if isinstance(record, bytes):
+            data = zlib.decompress(record)
+        else:
+            try:
+                data = self._read_archive_entry(*record)
+            except KeyError:
+                return None  # archive was replaced by one without this file
+
+        with self._lock:
+            # Skip caching if the document was replaced or removed meanwhile
+            if self._records.get(key) is record:
+                self._cache[key] = data
+                self._cache.move_to_end(key)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return data
+
+    def get(self, repo: str, filename: str) -> str | None:
+        """
+        Return the full text of a document.
+
+        Args:
+            repo (str): Repository name.
+            filename (str): Normalized file path inside the repository.
+
+        Returns:
+            str | None: Document text, or None if the document is unknown.
+        """
+        data = self.get_bytes(repo, filename)
+        return None if data is None else data.decode("utf-8")
+
+    def read_bytes(
+        self,
+        repo: str,
+        filename: str,
+        start: int = 0,
+        length: int | None = None,
+    ) -> bytes | None:
+        """
+        Return a UTF-8 byte range of a document.
+
+        With a `length`, a document that is not cached is only decompressed up
+        to the end of the range, and the full text is never materialized.
+
+        Args:
+            repo (str): Repository name.
+            filename (str): Normalized file path inside the repository.
+            start (int): Start byte offset.
+            length (int | None): Number of bytes to return; None reads to the end.
+
+        Returns:
+            bytes | None: The raw range (possibly cutting characters at its
+                boundaries), or None if the document is unknown.
+        """
+        key = (repo, filename)
+        end = None if length is None else start + length
+
+        with self._lock:
+            data = self._cache.get(key)
+            record = self._records.get(key)
+            partial = data is None and record is not None and end is not None
+            if partial:
+                self.misses += 1
+
+        if partial:
+            # Decode only the prefix that contains the range; do not cache it
+            try:
+                data = self._read_prefix(record, end)
+            except KeyError:
+                return None  # archive was replaced by one without this file
+            return data[start:end]
+
+        data = self.get_bytes(repo, filename)
+        if data is None:
+            return None
+        return data[start:end]
+
+    def read(
+        self,
+        repo: str,
+        filename: str,
+        start: int = 0,
+        length: int | None = None,
+    ) -> str | None:
+        """
+        Return a slice of a document addressed by UTF-8 byte offsets.
+
+        Partial characters at the slice boundaries are dropped (see `read_bytes`).
+
+        Args:
+            repo (str): Repository name.
+            filename (str): Normalized file path inside the repository.
+            start (int): Start byte offset.
+            length (int | None): Number of bytes to return; None reads to the end.
+
+        Returns:
+            str | None: The decoded slice, or None if the document is unknown.
+        """
+        data = self.read_bytes(repo, filename, start, length)
+        return None if data is None else data.decode("utf-8", errors="ignore")
+
+    def _read_prefix(self, record: bytes | tuple[str, str], end: int) -> bytes:
+        """Decompress at most the first `end` bytes of a document."""
+        if isinstance(record, bytes):
+            return zlib.decompressobj().decompress(record, end)
+
+        archive, entry = self._archive_entry(*record)
+        with archive.open(entry) as f:
+            raw = f.read(end)
+        # Normalize like ingestion did; a character cut at the end is held back
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        return decoder.decode(raw, final=False).encode("utf-8")
+
+    def stats(self) -> dict:
+        """
+        Return store size and cache counters.
+
+        Returns:
+            dict: documents, compressed_bytes (inline blobs only), cached
+                documents and bytes, open archives, hits, misses and hit_rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "documents": len(self._records),
+                "compressed_bytes": sum(
+                    len(record) for record in self._records.values() if isinstance(record, bytes)
+                ),
+                "cached_documents": len(self._cache),
+                "cached_bytes": sum(len(data) for data in self._cache.values()),
+                "open_archives": len(self._archives),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        """Close any archives opened for lazy reads."""
+        with self._lock:
+            for archive in self._archives.values():
+                archive.close()
+            self._archives.clear()
+            self._roots.clear()
+            self._cache.clear()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from download import download_zip_files
+
+
+def build_archive(files: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(files):
+            zf.writestr(f"repo-main/docs/page{i}.md", f"# Page {i}\n\n" + "text " * 500)
+    return buffer.getvalue()
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Local stand-in for GitHub archive URLs with ETag and Range support."""
+
+    archives: dict[str, bytes] = {}
+    requests_seen: list[tuple[str, int]] = []
+
+    def do_GET(self) -> None:
+        body = self.archives.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.requests_seen.append((self.path, 304))
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == etag:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+
+        status = 206 if start else 200
+        self.requests_seen.append((self.path, status))
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body) - start))
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def main() -> None:
+    repos = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    for i in range(repos):
+        ArchiveHandler.archives[f"/repo{i}.zip"] = build_archive(50 + i)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArchiveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    downloads = [
+        {"url": f"{base_url}/repo{i}.zip", "filename": f"repo{i}.zip"}
+        for i in range(repos)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checksums = download_zip_files(downloads, tmp_dir, max_concurrency=2)
+        for i in range(repos):
+            expected = hashlib.sha256(ArchiveHandler.archives[f"/repo{i}.zip"]).hexdigest()
+            assert checksums[f"repo{i}.zip"] == expected
+        print(f"Downloaded {repos} archives concurrently")
+
+        ArchiveHandler.requests_seen.clear()
+        download_zip_files(downloads, tmp_dir)
+        assert all(status == 304 for _, status in ArchiveHandler.requests_seen)
+        print("Revalidated cached archives (304 Not Modified)")
+
+        # An archive replaced in place (e.g. by a refresh) is rehashed on 304
+        replaced = build_archive(7)
+        with open(os.path.join(tmp_dir, "repo1.zip"), "wb") as f:
+            f.write(replaced)
+        ArchiveHandler.requests_seen.clear()
+        checksums = download_zip_files(downloads[1:2], tmp_dir)
+        assert ArchiveHandler.requests_seen == [("/repo1.zip", 304)]
+        assert checksums["repo1.zip"] == hashlib.sha256(replaced).hexdigest()
+        print("Rehashed an archive replaced on disk instead of trusting its sidecar")
+
+        # Simulate an interrupted download of repo0
+        zip_path = os.path.join(tmp_dir, "repo0.zip")
+        os.replace(f"{zip_path}.json", f"{zip_path}.part.json")
+        with open(zip_path, "rb") as f:
+            data = f.read()
+        with open(f"{zip_path}.part", "wb") as f:
+            f.write(data[: len(data) // 2])
+        os.remove(zip_path)
+
+        ArchiveHandler.requests_seen.clear()
+        checksums = download_zip_files(downloads[:1], tmp_dir)
+        assert ArchiveHandler.requests_seen == [("/repo0.zip", 206)]
+        assert checksums["repo0.zip"] == hashlib.sha256(data).hexdigest()
+        print("Resumed partial download with a Range request")
+
+        try:
+            download_zip_files(
+                [{**downloads[1], "filename": "bad.zip", "sha256": "0" * 64}],
+                tmp_dir,
+            )
+        except ValueError as exc:
+            print(f"Rejected corrupt archive: {exc}")
+        else:
+            raise AssertionError("checksum mismatch was not detected")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
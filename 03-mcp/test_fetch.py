@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from page_cache import PageCache
+from scrape import PageFetcher
+
+
+class ReaderHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the reader service: echoes the requested URL."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+    lock = threading.Lock()
+    requests_seen: list[str] = []
+    connections: set[int] = set()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_GET(self) -> None:
+        cls = type(self)
+        with cls.lock:
+            cls.requests_seen.append(self.path)
+            cls.connections.add(self.client_address[1])
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+
+        time.sleep(0.05)
+        if "missing" in self.path:
+            body, status = b"not found", 404
+        else:
+            body, status = f"# Page\n\nContent of {self.path[1:]}\n".encode() * 20, 200
+
+        with cls.lock:
+            cls.in_flight -= 1
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def main() -> None:
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReaderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    reader_prefix = f"http://127.0.0.1:{server.server_port}/"
+    urls = [f"https://example.com/page{i}" for i in range(pages)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fetcher = PageFetcher(reader_prefix=reader_prefix, cache=PageCache(cache_dir))
+
+        for url in urls[:5]:
+            fetcher.fetch(url)
+        assert len(ReaderHandler.connections) == 1
+        print("Sequential fetches reused one pooled connection")
+
+        results = asyncio.run(fetcher.fetch_many(urls, max_concurrency=4))
+        assert [r["url"] for r in results] == urls
+        assert all("content" in r for r in results)
+        assert ReaderHandler.max_in_flight <= 4
+        assert len(ReaderHandler.requests_seen) == pages  # first five came from the cache
+        print(f"Fetched {pages} pages with at most {ReaderHandler.max_in_flight} in flight")
+
+        async def fetch_async(count: int) -> None:
+            for i in range(count):
+                await fetcher.afetch(f"https://example.com/async{i}")
+            await fetcher.aclose()
+
+        ReaderHandler.connections.clear()
+        asyncio.run(fetch_async(5))
+        assert len(ReaderHandler.connections) == 1
+        print("Async fetches reused one pooled connection")
+
+        ReaderHandler.requests_seen.clear()
+        results = asyncio.run(fetcher.fetch_many(urls + ["https://example.com/missing"]))
+        assert ReaderHandler.requests_seen == ["/https://example.com/missing"]
+        assert "error" in results[-1]
+        print("Repeated scrapes were served from the cache; failures are reported per URL")
+
+        fetcher.cache.ttl = 0
+        ReaderHandler.requests_seen.clear()
+        fetcher.fetch(urls[0])
+        assert len(ReaderHandler.requests_seen) == 1
+        print("Expired entries are fetched again")
+
+        small = PageCache(cache_dir, max_bytes=4 * len(results[0]["content"].encode()))
+        fetcher.cache = small
+        for url in urls:
+            fetcher.fetch(url)
+        assert small.stats()["bytes"] <= small.max_bytes
+        print(f"Size budget enforced: {small.stats()['entries']} entries, {small.stats()['bytes']} bytes")
+
+        fetcher.close()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
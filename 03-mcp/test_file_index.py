@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from file_index import FileIndex
+
+
+def main() -> None:
+    index = FileIndex(
+        [
+            ("A", "README.md"),
+            ("B", "docs/README.md"),
+            ("A", "docs/servers/server.md"),
+            ("B", "sdk/python/server.md"),
+            ("A", "docs/servers/auth.mdx"),
+            ("B", "docs/clients/client.mdx"),
+        ]
+    )
+
+    assert index.resolve("README.md") == [("A", "README.md")]
+    assert index.resolve("/README.md/") == [("A", "README.md")]
+    assert index.resolve("README.md", repo="B") == [("B", "docs/README.md")]
+    assert index.resolve("README.md", repo="C") == []
+    print("Exact paths win, but only within the requested repo")
+
+    assert index.resolve("server.md") == [
+        ("A", "docs/servers/server.md"),
+        ("B", "sdk/python/server.md"),
+    ]
+    assert index.resolve("python/server.md") == [("B", "sdk/python/server.md")]
+    assert index.resolve("server.md", repo="A") == [("A", "docs/servers/server.md")]
+    assert index.resolve("ver.md") == []
+    print("Basenames and suffix paths match whole components")
+
+    assert index.find("docs/servers/") == [
+        ("A", "docs/servers/auth.mdx"),
+        ("A", "docs/servers/server.md"),
+    ]
+    assert index.find("*.mdx") == [
+        ("B", "docs/clients/client.mdx"),
+        ("A", "docs/servers/auth.mdx"),
+    ]
+    assert index.find("docs/*/auth*") == [("A", "docs/servers/auth.mdx")]
+    assert index.find("docs/", limit=2) == [
+        ("B", "docs/README.md"),
+        ("B", "docs/clients/client.mdx"),
+    ]
+    print("Prefix and glob patterns find files in path order")
+
+    layered = FileIndex([("web", "example.com/docs/server.md"), ("web", "README.md")], base=index)
+    assert layered.resolve("README.md") == [("A", "README.md"), ("web", "README.md")]
+    assert layered.resolve("docs/server.md") == [("web", "example.com/docs/server.md")]
+    assert layered.resolve("server.md", repo="A") == [("A", "docs/servers/server.md")]
+    assert layered.find("*.md", limit=5) == [
+        ("A", "README.md"),
+        ("web", "README.md"),
+        ("B", "docs/README.md"),
+        ("A", "docs/servers/server.md"),
+        ("web", "example.com/docs/server.md"),
+    ]
+    assert layered.find("README") == [("A", "README.md"), ("web", "README.md")]
+    assert index.resolve("docs/server.md") == []
+    print("A layer adds its files to the index below it without changing it")
+
+
+if __name__ == "__main__":
+    main()
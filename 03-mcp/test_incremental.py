@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import random
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from passages import split_documents
+from postings import CompactIndex
+from search import (
+    create_search_index,
+    diff_manifests,
+    iter_docs_from_zip_file,
+    read_zip_manifest,
+)
+
+REPO = "synthetic"
+WORDS = [f"word{i}" for i in range(300)]
+
+
+def make_page(rng: random.Random, title: str) -> str:
+    """Create a Markdown page with a few sections."""
+    sections = [f"# {title}", ""]
+    for i in range(rng.randint(1, 4)):
+        sections += [f"## Part {i}", "", " ".join(rng.choices(WORDS, k=rng.randint(5, 80))), ""]
+    return "\n".join(sections)
+
+
+def write_archive(path: Path, files: dict[str, str]) -> None:
+    """Write files under a single root directory, like a GitHub archive."""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(f"{REPO}-main/{name}", content)
+
+
+def load(directory: str, name: str, only: set[str] | None = None) -> list[dict]:
+    """Decode documents (optionally only some paths) and split them into passages."""
+    documents = [
+        {**doc, "repo": REPO} for doc in iter_docs_from_zip_file(directory, name, only=only)
+    ]
+    return split_documents(documents)
+
+
+def ranked(index, queries: list[str]) -> list[list[tuple[float, str]]]:
+    """Return (score, passage id) per query, ties ordered by id."""
+    return [
+        sorted(((score, doc["id"]) for score, doc in results), key=lambda hit: (-hit[0], hit[1]))
+        for results in index.search_batch_scored(queries, num_results=20)
+    ]
+
+
+def assert_same_ranking(got: list, want: list) -> None:
+    """Check that two rankings hold the same hits with the same scores."""
+    for got_hits, want_hits in zip(got, want):
+        assert [hit_id for _, hit_id in got_hits] == [hit_id for _, hit_id in want_hits]
+        assert np.allclose(
+            [score for score, _ in got_hits], [score for score, _ in want_hits], rtol=1e-5
+        )
+
+
+def main() -> None:
+    rng = random.Random(0)
+    before = {f"docs/page{i}.md": make_page(rng, f"Page {i}") for i in range(60)}
+    before["src/module.py"] = "print('not indexed')\n"
+
+    after = dict(before)
+    after["docs/new.md"] = make_page(rng, "New") + "\nquokka word1\n"
+    after["docs/page3.md"] = make_page(rng, "Changed") + "\nquokka\n"
+    del after["docs/page7.md"]
+
+    queries = [
+        "quokka", "word1 word2", "word250 word17 word17", "part", "page7", "new", "changed",
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_archive(Path(directory) / "before.zip", before)
+        write_archive(Path(directory) / "after.zip", after)
+
+        index = create_search_index(load(directory, "before.zip"), backend="bm25")
+
+        added, modified, removed = diff_manifests(
+            read_zip_manifest(directory, "before.zip"), read_zip_manifest(directory, "after.zip")
+        )
+        assert (added, modified, removed) == ({"docs/new.md"}, {"docs/page3.md"}, {"docs/page7.md"})
+        print("Manifest diff finds the added, changed and removed files")
+
+        changed = load(directory, "after.zip", only=added | modified)
+        removed_keys = {(REPO, filename) for filename in modified | removed}
+        updated = index.updated(changed, removed_keys)
+        rebuilt = create_search_index(load(directory, "after.zip"), backend="bm25")
+
+        assert sorted(doc["id"] for doc in updated.docs) == sorted(doc["id"] for doc in rebuilt.docs)
+        assert_same_ranking(ranked(updated, queries), ranked(rebuilt, queries))
+        print("An updated index ranks like a full rebuild")
+
+        compact = CompactIndex.from_bm25(index).updated(changed, removed_keys)
+        assert_same_ranking(ranked(compact, queries), ranked(rebuilt, queries))
+        print("An updated compact index ranks like a full rebuild")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from passages import split_documents, split_passages
+
+DOCUMENT = """Intro before any heading, with ünïcödé.
+
+# Server
+
+Start a server.
+
+```python
+# not a heading
+server.run()
+```
+
+## Usage
+
+Call it.
+
+## Usage
+
+Again, with more text — and more.
+
+### Déjà vu
+
+Nested section.
+"""
+
+
+def main() -> None:
+    doc = {"repo": "demo", "filename": "docs/server.md", "content": DOCUMENT}
+    encoded = DOCUMENT.encode("utf-8")
+    passages = split_passages(doc)
+
+    assert [p["id"] for p in passages] == [
+        "docs/server.md#top",
+        "docs/server.md#server",
+        "docs/server.md#usage",
+        "docs/server.md#usage-1",
+        "docs/server.md#déjà-vu",
+    ]
+    assert [p["section"] for p in passages] == ["", "Server", "Usage", "Usage", "Déjà vu"]
+    print("Passages follow the headings, ignoring '#' lines inside code fences")
+
+    for passage in passages:
+        assert encoded[passage["start"]:passage["end"]].decode("utf-8") == passage["content"]
+        assert passage["repo"] == "demo" and passage["filename"] == "docs/server.md"
+    assert passages[0]["start"] == 0 and passages[-1]["end"] == len(encoded)
+    assert all(a["end"] == b["start"] for a, b in zip(passages, passages[1:]))
+    print("Byte offsets slice each passage out of the UTF-8 document, end to end")
+
+    chunked = split_passages(doc, max_bytes=24)
+    assert all(p["end"] - p["start"] <= 24 for p in chunked)
+    assert b"".join(encoded[p["start"]:p["end"]] for p in chunked) == encoded
+    for passage in chunked:
+        assert encoded[passage["start"]:passage["end"]].decode("utf-8") == passage["content"]
+    parts = [p["id"] for p in chunked if p["id"].startswith("docs/server.md#usage-1")]
+    assert parts[0] == "docs/server.md#usage-1" and parts[1] == "docs/server.md#usage-1~2"
+    print("Size-bounded parts never split a UTF-8 character and get '~<n>' ids")
+
+    unchanged = split_passages({**doc, "content": DOCUMENT.replace("Call it.", "Call it now.")})
+    assert [p["id"] for p in unchanged] == [p["id"] for p in passages]
+    assert [p["content"] for p in unchanged][-1] == passages[-1]["content"]
+    print("Ids stay stable when another section changes")
+
+    blank = {"filename": "blank.md", "content": "# Empty\n\n\n# Full\n\ntext\n"}
+    assert [p["id"] for p in split_documents([blank, doc])][:2] == [
+        "blank.md#empty",
+        "blank.md#full",
+    ]
+    assert split_passages({"filename": "none.md", "content": "  \n"}) == []
+    print("Documents keep their order, and whitespace-only ones produce no passages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pickle
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from bm25 import BM25Index
+from postings import CompactIndex, decode_varints, encode_varints
+
+
+def make_docs(count: int, seed: int = 0) -> list[dict]:
+    """Generate documents with a skewed vocabulary, like real prose."""
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return [
+        {
+            "repo": "synthetic",
+            "filename": f"docs/page{i}.md",
+            "content": " ".join(rng.choices(words, weights=weights, k=200)),
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    values = np.array([0, 1, 127, 128, 16_383, 16_384, 2**40], dtype=np.int64)
+    assert (decode_varints(encode_varints(values)) == values).all()
+    print("Varints round-trip")
+
+    index = BM25Index(["filename", "content"], {"filename": 2.0}).fit(make_docs(count))
+    queries = ["term1 term20", "term300 term4000 term4000", "page17", "missing words"]
+    expected = index.search_batch_scored(queries, num_results=10)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "shard.idx")
+        CompactIndex.from_bm25(index).save(path)
+        compact = CompactIndex.load(path)
+
+        results = compact.search_batch_scored(queries, num_results=10)
+        for want, got in zip(expected, results):
+            assert [doc["filename"] for _, doc in want] == [doc["filename"] for _, doc in got]
+            assert np.allclose([s for s, _ in want], [s for s, _ in got], rtol=1e-6)
+        print(f"Compact index ({compact.nbytes} bytes, mapped) matches the sparse index")
+
+        rng = random.Random(1)
+        long_queries = [
+            " ".join(f"term{rng.randint(0, 4999)}" for _ in range(rng.randint(2, 30)))
+            for _ in range(50)
+        ]
+        for candidate in (index, compact):
+            for k in (1, 10):
+                exhaustive = candidate.search_batch_scored(long_queries, num_results=k)
+                pruned = candidate.search_batch_scored(long_queries, num_results=k, prune=True)
+                assert exhaustive == pruned
+        print("Pruned searches return exactly the exhaustive results")
+
+        assert len(pickle.dumps(compact)) < 200  # only the path is pickled
+        assert pickle.loads(pickle.dumps(compact)).search("term1", 3) == compact.search("term1", 3)
+        print("Pickled index re-maps its file")
+
+        updated = compact.updated(
+            [{"repo": "synthetic", "filename": "docs/new.md", "content": "walrus term1"}],
+            {("synthetic", "docs/page0.md")},
+        )
+        assert updated.search("walrus", 1)[0]["filename"] == "docs/new.md"
+        assert all(doc["filename"] != "docs/page0.md" for doc in updated.docs)
+        print("Updates decode the index and apply the change")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,9 +12,7 @@ def main() -> None:
 
     search.download_zip_file_from_url(repo_url, zip_path, zip_file)
 
-    zip_root = search.discover_zip_root(zip_path, zip_file)
-    md_files = search.parse_zip_file(zip_path, zip_file)
-    docs = search.create_docs_from_zip_file(zip_path, zip_file, zip_root, md_files)
+    docs = search.iter_docs_from_zip_file(zip_path, zip_file)
 
     index = search.create_search_index(docs)
 
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import zipfile
+from pathlib import Path
+
+import main as server
+from file_index import FileIndex
+from passages import build_outline
+from state import IndexState
+from store import DocumentStore
+
+DOCUMENT = """Preamble.
+
+# Changelog
+
+## v2.0 — Ünicode
+
+- Breaking: renamed `run`.
+
+### Migration
+
+Rename calls.
+
+## v1.0
+
+- First release.
+"""
+
+
+def check_outline() -> None:
+    encoded = DOCUMENT.encode("utf-8")
+    outline = build_outline(DOCUMENT)
+    assert [(h["level"], h["id"]) for h in outline] == [
+        (1, "changelog"),
+        (2, "v20--ünicode"),
+        (3, "migration"),
+        (2, "v10"),
+    ]
+    for heading in outline:
+        # Every range starts at its heading line
+        assert encoded[heading["start"]:].startswith(b"#" * heading["level"] + b" ")
+    changelog, v2, migration, v1 = outline
+    assert changelog["end"] == len(encoded)
+    assert v2["end"] == v1["start"] and migration["end"] == v1["start"]
+    print("Outline ranges are UTF-8 byte offsets and include their subsections")
+
+
+def check_reads(store: DocumentStore) -> None:
+    server.publish(
+        IndexState(
+            shards={"demo": None},
+            document_store=store,
+            file_index=FileIndex(store.keys()),
+            repos=("demo",),
+            ready=True,
+        )
+    )
+
+    outline = asyncio.run(server.get_outline("CHANGELOG.md"))
+    assert outline["size"] == len(DOCUMENT.encode("utf-8"))
+    v2 = next(h for h in outline["sections"] if h["title"].startswith("v2.0"))
+
+    def read(**kwargs) -> str:
+        return asyncio.run(server.read_repo_file("CHANGELOG.md", **kwargs))
+
+    section = read(section=v2["id"])
+    assert section.startswith("## v2.0 — Ünicode") and section.endswith("Rename calls.\n\n")
+    assert read(section="v2.0 — ünicode") == section  # titles match case-insensitively
+    assert read(section="CHANGELOG.md#v10") == "## v1.0\n\n- First release.\n"
+    assert read(section="top") == "Preamble.\n\n"
+    assert read(section="migration", offset=4, length=10) == "Migration\n"
+    assert read(offset=v2["start"], length=8) == "## v2.0 "
+    # Ranged reads decode a prefix of the file and do not cache it
+    assert store.stats()["cached_documents"] == 0
+    assert read() == DOCUMENT
+
+    try:
+        read(section="v3.0")
+    except ValueError as exc:
+        assert "changelog, v20--ünicode, migration, v10" in str(exc)
+    else:
+        raise AssertionError("unknown section was read")
+
+
+def main() -> None:
+    check_outline()
+
+    store = DocumentStore(cache_size=0)
+    store.add_text("demo", "CHANGELOG.md", DOCUMENT, outline=build_outline(DOCUMENT))
+    check_reads(store)
+    print("Sections, titles, passage ids and byte ranges read from compressed text")
+
+    with tempfile.TemporaryDirectory() as directory:
+        zip_path = str(Path(directory) / "demo.zip")
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("demo-main/CHANGELOG.md", DOCUMENT)
+        store = DocumentStore(cache_size=4)
+        store.add_archive_document(
+            "demo", "CHANGELOG.md", zip_path, content=DOCUMENT, outline=build_outline(DOCUMENT)
+        )
+        check_reads(store)
+        assert store.stats()["cached_documents"] == 1  # from the full read
+        store.close()
+    print("The same reads work from the archive")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from snippets import make_snippet, query_pattern, sentence_starts
+
+DOCUMENT = (
+    "Intro about nothing. Filler text goes here and keeps going for a while. "
+    "The server starts quickly. Then the client connects to the server over stdio. "
+    "More filler after that.\nA new line about tools."
+)
+
+
+def main() -> None:
+    assert list(sentence_starts(DOCUMENT)) == [0, 21, 72, 99, 150, 174]
+    text = "Déjà vu. Ünïcode here.\nNext"
+    encoded = text.encode("utf-8")
+    starts = sentence_starts(text)
+    assert list(starts) == [0, 11, 27]
+    assert encoded[starts[1]:].startswith("Ünïcode".encode("utf-8"))
+    print("Sentence and line starts are UTF-8 byte offsets")
+
+    pattern = query_pattern("Server servers")
+    assert pattern.findall(b"servers SERVER observer server_x server.") == [
+        b"servers",
+        b"SERVER",
+        b"server",
+    ]
+    assert query_pattern("") is None
+    print("Query terms match whole words, case-insensitively")
+
+    data = DOCUMENT.encode("utf-8")
+    starts = sentence_starts(DOCUMENT)
+    pattern = query_pattern("server client")
+    assert make_snippet(data, 0, starts, pattern, 80) == (
+        "The **server** starts quickly. Then the **client** connects to the **server** over stdio."
+    )
+    assert make_snippet(data, 0, starts, pattern, 80, highlight="") == (
+        "The server starts quickly. Then the client connects to the server over stdio."
+    )
+    print("Windows start and end at sentence boundaries and highlight each match")
+
+    spread = "The server is up. " + "Filler words keep the two apart here. " * 3
+    spread += "Server and client talk. Bye."
+    snippet = make_snippet(spread.encode("utf-8"), 0, sentence_starts(spread), pattern, 40)
+    assert snippet == "**Server** and **client** talk. Bye."
+    print("The window with the most distinct terms wins over the first match")
+
+    # Without sentence starts the window falls back to word boundaries
+    assert make_snippet(data, 0, None, pattern, 80) == (
+        "for a while. The **server** starts quickly. Then the **client** connects to the **server**"
+    )
+    long = "word " * 60 + "needle " + "word " * 60
+    needle = query_pattern("needle")
+    snippet = make_snippet(long.encode("utf-8"), 0, sentence_starts(long), needle, 60)
+    assert snippet == "word word **needle** word word word word word word word word"
+    print("Long sentences are cut between words around the match")
+
+    base = data.index(b"The server")
+    passage = data[base:]
+    assert make_snippet(passage, base, starts, query_pattern("tools"), 60) == (
+        "A new line about **tools**."
+    )
+    assert make_snippet(data, 0, starts, None, 40) == "Intro about nothing."
+    assert make_snippet(data, 0, starts, query_pattern("absent"), 40) == "Intro about nothing."
+    print("Passages map document offsets, and no match gives the passage start")
+
+
+if __name__ == "__main__":
+    main()
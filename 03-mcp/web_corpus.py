@@ -0,0 +1,116 @@
+import itertools
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+WEB_REPO = "web"
+
+
+def web_filename(url: str) -> str:
+    """
+    Turn a URL into the path a scraped page is indexed under.
+
+    Args:
+        url (str): Page URL.
+
+    Returns:
+        str: "<host>/<path>[?query]" without a trailing slash, e.g.
+            "gofastmcp.com/servers/tools".
+    """
+    parts = urlsplit(url)
+    filename = f"{parts.netloc}{parts.path}".rstrip("/")
+    return f"{filename}?{parts.query}" if parts.query else filename
+
+
+class WebCorpus:
+    """
+    Bounded, thread-safe collection of scraped pages to index under `WEB_REPO`.
+
+    Pages are kept in insertion order; re-scraping a page moves it to the end.
+    When `max_pages` or `max_bytes` is exceeded the oldest pages are evicted.
+    Each stored page gets a new version number, so an index state can tell
+    which of its web documents are stale.
+
+    Attributes:
+        max_pages (int): Maximum number of pages.
+        max_bytes (int): Maximum total UTF-8 size of the pages.
+        max_page_bytes (int): Pages are truncated to this many bytes.
+    """
+
+    def __init__(
+        self,
+        max_pages: int = 200,
+        max_bytes: int = 20 * 1024 * 1024,
+        max_page_bytes: int = 512 * 1024,
+    ):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_page_bytes = max_page_bytes
+        # filename -> (version, text, url, size in bytes)
+        self._pages: OrderedDict[str, tuple[int, str, str, int]] = OrderedDict()
+        self._bytes = 0
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, url: str, text: str) -> str:
+        """
+        Store a scraped page, evicting the oldest pages beyond the caps.
+
+        Args:
+            url (str): Page URL.
+            text (str): Page text.
+
+        Returns:
+            str: The filename the page is indexed under.
+        """
+        filename = web_filename(url)
+        encoded = text.encode("utf-8")
+        if len(encoded) > self.max_page_bytes:
+            text = encoded[: self.max_page_bytes].decode("utf-8", errors="ignore")
+        size = len(text.encode("utf-8"))
+
+        with self._lock:
+            previous = self._pages.pop(filename, None)
+            if previous is not None:
+                self._bytes -= previous[3]
+
+            # Unchanged pages keep their version so they are not re-indexed
+            version = previous[0] if previous and previous[1] == text else next(self._versions)
+            self._pages[filename] = (version, text, url, size)
+            self._bytes += size
+
+            while len(self._pages) > 1 and (
+                len(self._pages) > self.max_pages or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._pages.popitem(last=False)
+                self._bytes -= evicted[3]
+
+        return filename
+
+    def snapshot(self) -> dict[str, tuple[int, str, str]]:
+        """
+        Return the current pages.
+
+        Returns:
+            dict[str, tuple[int, str, str]]: filename -> (version, text, url).
+        """
+        with self._lock:
+            return {
+                filename: (version, text, url)
+                for filename, (version, text, url, _) in self._pages.items()
+            }
+
+    def stats(self) -> dict:
+        """
+        Return corpus size counters.
+
+        Returns:
+            dict: pages, bytes, max_pages and max_bytes.
+        """
+        with self._lock:
+            return {
+                "pages": len(self._pages),
+                "bytes": self._bytes,
+                "max_pages": self.max_pages,
+                "max_bytes": self.max_bytes,
+            }